@@ -1,24 +1,98 @@
+import sys
 import json
 import asyncio
 import argparse
-from boss_zhipin import BossZhipin
-from job_writer import spawn_workflow
+from pathlib import Path
+from typing import AsyncGenerator
+from job_writer import LetterStats, spawn_workflow, add_refine_args, refine_options
+from llm_cache import add_cache_args, open_cache
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from resume import add_profile_args, describe_candidate
+from job_stream import read_jobs
+from tracing import traced, count
 
 
-if __name__ == "__main__":
-    cliparser = argparse.ArgumentParser(description="查询匹配的职位。")
+description = "针对收藏的岗位撰写沟通文案并自动发起沟通。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
     cliparser.add_argument("--resume", help="简历文件路径 (目前只支持文本文件，推荐使用Markdown)", type=str, required=True)
-    cliparser.add_argument("--jobs", help="收藏岗位列表JSON文件路径", type=str, required=True)
-    args, _ = cliparser.parse_known_args()
+    cliparser.add_argument("--jobs", help="收藏岗位列表文件路径 (支持.json及.jsonl)", type=str, required=True)
+    cliparser.add_argument("--follow", help="等待查询开始并持续读取其.jsonl岗位列表，直至查询结束", action="store_true")
+    cliparser.add_argument("--letters", help="沟通文案JSON文件路径，已有文案的岗位不再重新撰写 (默认: letters.json)", type=str, default="letters.json")
+    cliparser.add_argument("--writers", help="并发撰写文案的数量 (默认: 4)", type=int, default=4)
+    cliparser.add_argument("--no_block", help="不拦截图片、字体等无关资源及统计脚本", action="store_true")
+    cliparser.add_argument("--route_stats", help="运行结束时输出网络请求统计", action="store_true")
+    add_profile_args(cliparser)
+    add_refine_args(cliparser)
+    add_cache_args(cliparser)
+    add_ratelimit_args(cliparser)
+    cliparser.add_argument("--trace", help="将各阶段耗时及tokens用量写入JSONL文件，并在结束时输出汇总", type=str)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from boss_zhipin import BossZhipin, Job
+    configure_limits(args)
+    with open(args.resume, "r") as f:
+        resume = f.read()
+    candidate = await describe_candidate(resume, args.full_resume, args.profiles)
+    letters_path = Path(args.letters)
+    if letters_path.exists():
+        with open(letters_path, "r", encoding="utf-8") as f:
+            letters = json.load(f)
+    else:
+        letters = {}
+    cache = open_cache(args)
+    options = refine_options(args)
+    writers = asyncio.Semaphore(args.writers)
+    ready = asyncio.Queue()
+
+    async def write(job: dict[str, str]) -> None:
+        info = Job.Info.model_validate(job)
+        if info.url not in letters:
+            async with writers:
+                workflow = spawn_workflow(candidate, info.description(), cache, options)
+                stats = LetterStats()
+                try:
+                    letters[info.url] = await workflow(args.rounds, stats)
+                except Exception as e:
+                    # Without a letter the job is not applied to; a later run retries it.
+                    print(f"{info.company} {info.title}: 撰写文案失败，跳过: {e!r}", file=sys.stderr)
+                    count("writer.failed")
+                    return
+            print(f"{info.company} {info.title}: {stats.report()}", file=sys.stderr)
+            with open(letters_path, "w", encoding="utf-8") as f:
+                json.dump(letters, f, ensure_ascii=False, indent=4)
+        await ready.put(job)
 
-    async def main() -> None:
-        with open(args.resume, "r") as f:
-            resume = f.read()
-        with open(args.jobs, "r") as f:
-            jobs = json.load(f)
-        zhipin = BossZhipin()
-        async for hr in zhipin.apply_jobs(jobs):
-            workflow = spawn_workflow(resume, hr.description())
-            await hr.send(await workflow(3))
-
-    asyncio.run(main())
+    async def feed() -> None:
+        tasks = []
+        try:
+            async for job in read_jobs(args.jobs, args.follow):
+                tasks.append(asyncio.create_task(write(job)))
+            await asyncio.gather(*tasks)
+        finally:
+            await ready.put(None)
+
+    async def ready_jobs() -> AsyncGenerator[dict[str, str], None]:
+        while (job := await ready.get()) is not None:
+            yield job
+
+    async def apply(zhipin: BossZhipin) -> None:
+        async for hr in zhipin.apply_jobs(ready_jobs()):
+            await hr.send(letters[hr.url])
+
+    with traced(args.trace):
+        async with BossZhipin(block=not args.no_block, stats=args.route_stats) as zhipin:
+            await asyncio.gather(apply(zhipin), feed())
+            if limiter.troubled():
+                print(limiter.report(), file=sys.stderr)
+            if args.route_stats:
+                print(zhipin.route_stats.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
@@ -0,0 +1,719 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from pydantic import BaseModel
+import boss_zhipin
+from boss_zhipin import BossZhipin, salary_mapping, decode_salary
+from salary import SalaryFloor, parse_salary
+from dedup import DedupIndex
+from job_store import JobStore
+from job_eval import JobEvaluator, add_cascade_args, cascade_options
+from resume import describe_candidate
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from tracing import traced
+from cli import commands
+
+
+glyphs = {digit: glyph for glyph, digit in salary_mapping.items()}
+titles = ["Python开发工程师", "后端开发工程师", "数据开发工程师", "机器学习工程师", "全栈开发工程师", "测试开发工程师", "Go开发工程师", "大模型应用工程师"]
+companies = ["星河", "云杉", "极光", "蓝鲸", "青藤", "北辰", "知行", "远景", "飞象", "明石"]
+industries = ["科技", "网络", "信息技术", "智能", "数据", "软件"]
+duties = [
+    "负责核心业务系统的设计与开发",
+    "参与数据平台建设，保障数据质量与时效",
+    "负责服务端接口开发与性能优化",
+    "参与大模型应用落地，负责提示词工程与评测",
+    "负责自动化测试框架的搭建与维护",
+    "与产品团队协作，推动需求落地",
+    "参与技术方案评审，编写技术文档",
+    "负责线上问题排查与稳定性建设",
+]
+requirements = [
+    "本科及以上学历，计算机相关专业",
+    "3年以上Python开发经验，熟悉asyncio",
+    "熟悉MySQL、Redis等常用中间件",
+    "熟悉Linux环境，具备良好的编码习惯",
+    "有爬虫或自动化相关经验者优先",
+    "熟悉PyTorch或Transformers者优先",
+    "具备良好的沟通能力和团队合作精神",
+    "熟悉Docker与Kubernetes",
+]
+benefits = ["五险一金", "带薪年假", "弹性工作", "年终奖", "定期体检", "免费三餐", "股票期权"]
+ratings = ["POOR", "FAIR", "GOOD", "EXCELLENT"]
+real_salaries = [
+    "15-25K", "15-25K·13薪", "20-40K·14薪", "30-50K·16薪", "8-13K", "3-5K", "1-2K", "100-150K·15薪",
+    "150-200元/天", "200-300元/天", "80-120元/天", "50-80元/时", "25-30元/时", "3000-5000元/月",
+    "8千-1.2万", "1-1.5万", "1.2-2万·13薪", "面议", "20K", "15-25K·14薪 面议",
+]
+salary_noise = ["K", "k", "万", "千", "元/天", "元/时", "元/月", "·", "薪", "-", "~", "至", "面议", " ", ".", "0", "9", "13", "\u3000", "@"]
+
+jobs_page = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>BOSS直聘</title>
+<style>
+@font-face { font-family: kanzhun; src: url(/static/font/kanzhun.woff2) format("woff2"); }
+body { margin: 0; font-family: sans-serif; }
+.nav-figure { height: 48px; }
+.job-list-container { display: none; width: 50%; }
+.job-card-box { height: 120px; border-bottom: 1px solid #eee; cursor: pointer; }
+.job-salary { font-family: kanzhun; }
+.company-logo { width: 32px; height: 32px; }
+.job-tag-icon { width: 24px; height: 16px; }
+.loading-wait { display: none; height: 40px; }
+.job-detail-box { position: fixed; top: 48px; right: 0; width: 48%; }
+.desc { white-space: pre-wrap; }
+</style></head>
+<body>
+<div class="nav-figure"><img src="/static/logo/avatar.png"></div>
+<div class="job-list-container"><ul class="rec-job-list"></ul><div class="loading-wait">加载中</div></div>
+<div class="job-detail-box"></div>
+<script>
+const params = new URLSearchParams(location.search);
+const container = document.querySelector(".job-list-container");
+const list = document.querySelector(".rec-job-list");
+const wait = document.querySelector(".loading-wait");
+const detail = document.querySelector(".job-detail-box");
+let page = 0, loading = false, more = true;
+const card = j => `<li class="job-card-box" data-sid="${j.securityId}" data-lid="${j.lid}">
+<a class="job-name" href="/job_detail/${j.encryptJobId}.html">${j.jobName}</a>
+<span class="job-salary">${j.salaryDesc}</span>
+<img class="company-logo" src="/static/logo/${j.logo}.png">
+<span class="boss-name">${j.brandName}</span>
+${j.goldHunter ? '<img class="job-tag-icon" alt="猎头" src="/static/tag/hunter.png">' : ''}
+${j.proxyJob ? '<img class="job-tag-icon" alt="派遣" src="/static/tag/proxy.png">' : ''}
+</li>`;
+async function load() {
+    if (loading || !more) return;
+    loading = true;
+    wait.style.display = "block";
+    const start = Date.now();
+    params.set("page", page + 1);
+    const data = (await (await fetch(`/wapi/zpgeek/search/joblist.json?${params}`)).json()).zpData;
+    page += 1;
+    more = data.hasMore;
+    list.insertAdjacentHTML("beforeend", data.jobList.map(card).join(""));
+    container.style.display = "block";
+    await new Promise(r => setTimeout(r, Math.max(0, 300 - (Date.now() - start))));
+    wait.style.display = "none";
+    loading = false;
+}
+window.addEventListener("scroll", () => {
+    if (innerHeight + scrollY >= document.documentElement.scrollHeight - 200) load();
+});
+list.addEventListener("click", async e => {
+    const c = e.target.closest(".job-card-box");
+    if (!c) return;
+    e.preventDefault();
+    const query = new URLSearchParams({securityId: c.dataset.sid, lid: c.dataset.lid});
+    const data = (await (await fetch(`/wapi/zpgeek/job/detail.json?${query}`)).json()).zpData;
+    detail.innerHTML = `<div class="job-detail-header"><span class="job-name">${data.jobInfo.jobName}</span>
+<span class="job-salary">${data.jobInfo.salaryDesc}</span>
+<a class="op-btn op-btn-like${data.relationInfo.interestJob ? ' active' : ''}">收藏</a></div>
+<p class="desc">${data.jobInfo.postDescription}</p>
+<div class="job-boss-info"><span class="boss-active-time">${data.bossInfo.activeTimeDesc}</span></div>`;
+    detail.querySelector(".op-btn-like").addEventListener("click", e => e.target.classList.add("active"));
+});
+load();
+</script>
+</body></html>"""
+
+detail_page = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+@font-face {{ font-family: kanzhun; src: url(/static/font/kanzhun.woff2) format("woff2"); }}
+.job-salary {{ font-family: kanzhun; }}
+.dialog-container {{ display: none; }}
+.input-area {{ min-height: 80px; border: 1px solid #ccc; }}
+</style></head>
+<body>
+<div class="info-primary">
+<h1 class="job-name">{title}</h1><span class="job-salary">{salary}</span>
+<img class="company-logo" src="/static/logo/{logo}.png">
+<a class="btn btn-startchat" href="javascript:;">立即沟通</a>
+</div>
+<div class="job-sec-text">{desc}</div>
+<div class="dialog-container">
+<div class="input-area" contenteditable="true"></div>
+<span class="send-message disable">发送</span>
+</div>
+<script>
+const dialog = document.querySelector(".dialog-container");
+const input = dialog.querySelector(".input-area");
+const send = dialog.querySelector(".send-message");
+document.querySelector(".btn-startchat").addEventListener("click", () => dialog.style.display = "block");
+input.addEventListener("input", () => send.classList.toggle("disable", !input.innerText.trim()));
+send.addEventListener("click", () => {{
+    if (send.classList.contains("disable")) return;
+    fetch("/wapi/zpchat/geek/send", {{method: "POST", body: input.innerText}});
+    input.innerText = "";
+    send.classList.add("disable");
+}});
+</script>
+</body></html>"""
+
+
+def encode_salary(salary: str) -> str:
+    return "".join(glyphs.get(c, c) for c in salary)
+
+
+def fake_job(key: str, i: int) -> dict:
+    rng = random.Random(f"{key}_{i}")
+    low = rng.randint(8, 40)
+    kind = rng.random()
+    if kind < 0.03:
+        salary = "面议"
+    elif kind < 0.1:
+        salary = f"{low * 10}-{low * 10 + rng.randint(5, 20) * 10}元/天"
+    elif kind < 0.12:
+        salary = f"{low * 2}-{low * 2 + rng.randint(5, 30)}元/时"
+    else:
+        salary = f"{low}-{low + rng.randint(2, 15)}K" + (f"·{rng.choice([13, 14, 15, 16])}薪" if rng.random() < 0.4 else "")
+    desc = "\n".join([
+        "岗位职责：",
+        *(f"{n}. {d}" for n, d in enumerate(rng.sample(duties, 4), 1)),
+        "任职要求：",
+        *(f"{n}. {r}" for n, r in enumerate(rng.sample(requirements, 4), 1)),
+        f"福利待遇：{'、'.join(rng.sample(benefits, 3))}",
+        f"岗位编号：{key}-{i}",
+    ])
+    return dict(
+        encryptJobId = f"{key}_{i}",
+        securityId = f"s{key}_{i}",
+        lid = f"l{i}",
+        jobName = rng.choice(titles),
+        salaryDesc = encode_salary(salary),
+        brandName = f"{rng.choice(companies)}{rng.choice(industries)}",
+        logo = i % 50,
+        goldHunter = i % 10 == 9,
+        proxyJob = i % 17 == 16,
+        active = "本月活跃" if i % 13 == 12 else "刚刚活跃",
+        desc = desc,
+    )
+
+
+def stub_completion(system: str, user: str) -> str:
+    digest = hashlib.sha256(user.encode("utf-8")).digest()
+    rating = ratings[digest[0] % len(ratings)]
+    if '[{"id":ID' in system:
+        ids = re.findall(r'<job-description id="(\d+)">', user)
+        return json.dumps([dict(id=int(i), rating=ratings[hashlib.sha256(f"{user}{i}".encode("utf-8")).digest()[0] % len(ratings)]) for i in ids])
+    if '"target_roles"' in system:
+        return json.dumps(dict(skills=["Python", "asyncio", "Playwright"], years=5, target_roles=["后端开发工程师"], salary_expectation="25-35K", highlights=["负责高并发爬虫平台的设计与开发"]), ensure_ascii=False)
+    if '"confidence"' in system:
+        return json.dumps(dict(rating=rating, confidence=round(0.5 + digest[1] / 510, 2)))
+    if '"rating"' in system:
+        improve = ratings.index(rating) < 2
+        return json.dumps(dict(rating=rating, feedback="请突出与岗位要求相关的项目经验。" if improve else "", needs_improvement=improve, focus_areas=["项目经验"] if improve else []), ensure_ascii=False)
+    lines = [f"{n}. 评级: {ratings[digest[n] % len(ratings)]}，该项与求职者的背景基本吻合。" for n in range(1, 7)]
+    return "\n".join(lines) + f"\n\n总体评级: {rating}"
+
+
+def message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+class FakeZhipin(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cards: int = 50, page_size: int = 15, latency: float = 0.0, llm_latency: float = 0.0, font_kb: int = 24, image_kb: int = 8, llm_429: float = 0.0, llm_rpm: float | None = None, llm_invalid: float = 0.0):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.cards = cards
+        self.page_size = page_size
+        self.latency = latency
+        self.llm_latency = llm_latency
+        self.font = random.Random(0).randbytes(font_kb * 1024)
+        self.image = random.Random(1).randbytes(image_kb * 1024)
+        self.llm_429 = llm_429
+        self.llm_rpm = llm_rpm
+        self.llm_invalid = llm_invalid
+        self.completions = 0
+        self.rejected = 0
+        self._window = []
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        with self._lock:
+            if random.random() < self.llm_429:
+                self.rejected += 1
+                return False
+            if self.llm_rpm:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.llm_rpm:
+                    self.rejected += 1
+                    return False
+                self._window.append(now)
+            self.completions += 1
+            return True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self) -> "FakeZhipin":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    server: FakeZhipin
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data: dict) -> None:
+        self._send(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _html(self, html: str) -> None:
+        self._send(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        time.sleep(self.server.latency)
+        if url.path == "/wapi/zpuser/wap/getUserInfo.json":
+            self._json(dict(code=0, message="Success", zpData=dict(userId=1, name="bench")))
+        elif url.path.startswith("/web/user/"):
+            self._html('<html><body><div class="nav-figure">bench</div></body></html>')
+        elif url.path == "/web/geek/jobs":
+            self._html(jobs_page)
+        elif url.path == "/wapi/zpgeek/search/joblist.json":
+            key = format(zlib.crc32(query.get("query", "").encode("utf-8")), "x")
+            page = int(query.get("page", 1))
+            end = min(page * self.server.page_size, self.server.cards)
+            jobs = [fake_job(key, i) for i in range((page - 1) * self.server.page_size, end)]
+            for job in jobs:
+                del job["desc"], job["active"]
+            self._json(dict(code=0, message="Success", zpData=dict(hasMore=end < self.server.cards, jobList=jobs)))
+        elif url.path == "/wapi/zpgeek/job/detail.json":
+            m = re.fullmatch(r"s(\w+)_(\d+)", query.get("securityId", ""))
+            if m is None:
+                self._json(dict(code=17, message="非法请求"))
+                return
+            job = fake_job(m.group(1), int(m.group(2)))
+            self._json(dict(code=0, message="Success", zpData=dict(
+                jobInfo = dict(encryptId=job["encryptJobId"], jobName=job["jobName"], salaryDesc=job["salaryDesc"], postDescription=job["desc"]),
+                brandComInfo = dict(brandName=job["brandName"]),
+                bossInfo = dict(activeTimeDesc=job["active"]),
+                relationInfo = dict(interestJob=False),
+            )))
+        elif m := re.fullmatch(r"/job_detail/(\w+)_(\d+)\.html", url.path):
+            job = fake_job(m.group(1), int(m.group(2)))
+            self._html(detail_page.format(title=job["jobName"], salary=job["salaryDesc"], logo=job["logo"], desc=job["desc"]))
+        elif url.path.startswith("/static/font/"):
+            self._send(self.server.font, "font/woff2")
+        elif url.path.startswith("/static/"):
+            self._send(self.server.image, "image/png")
+        else:
+            self._send(b"", "text/plain", 404)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.startswith("/v1/chat/completions"):
+            self._completion(json.loads(body))
+        else:
+            time.sleep(self.server.latency)
+            self._json(dict(code=0, message="Success"))
+
+    def _completion(self, request: dict) -> None:
+        messages = request.get("messages") or []
+        system = "".join(message_text(m) for m in messages if m.get("role") in ("system", "developer"))
+        user = "".join(message_text(m) for m in messages if m.get("role") == "user")
+        if not self.server.admit():
+            error = dict(error=dict(message="Rate limit exceeded", type="rate_limit_error", code="rate_limit_exceeded"))
+            body = json.dumps(error).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        content = stub_completion(system, user)
+        if content.startswith(("{", "[")) and random.random() < self.server.llm_invalid:
+            content = "好的，以下是评判结果: " + content[:len(content) // 2]
+        time.sleep(self.server.llm_latency)
+        usage = dict(prompt_tokens=(len(system) + len(user)) // 2, completion_tokens=len(content) // 2, total_tokens=(len(system) + len(user) + len(content)) // 2)
+        base = dict(id=f"chatcmpl-{self.server.completions}", created=int(time.time()), model=request.get("model", "stub"))
+        if not request.get("stream"):
+            self._json(dict(base, object="chat.completion", usage=usage, choices=[dict(index=0, message=dict(role="assistant", content=content), finish_reason="stop")]))
+            return
+        chunks = [dict(role="assistant", content=content[i:i + 64]) if i == 0 else dict(content=content[i:i + 64]) for i in range(0, len(content), 64)]
+        events = [dict(base, object="chat.completion.chunk", choices=[dict(index=0, delta=delta, finish_reason=None)]) for delta in chunks]
+        events.append(dict(base, object="chat.completion.chunk", choices=[dict(index=0, delta={}, finish_reason="stop")]))
+        events.append(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def stub_config(path: Path, server: FakeZhipin) -> None:
+    path.write_text(f"""default_model: "generic.stub"
+
+generic:
+  api_key: "bench"
+  base_url: "{server.url}/v1"
+
+logger:
+  type: "none"
+  progress_display: false
+  show_chat: false
+  show_tools: false
+""", encoding="utf-8")
+
+
+def tree_rss(root: int) -> int:
+    children = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            ppid = int(stat.read_text().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(stat.parent.name))
+    total = 0
+    stack = [root]
+    while stack:
+        pid = stack.pop()
+        try:
+            total += int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class RssSampler:
+    peak: int
+
+    def __init__(self, interval: float = 0.25):
+        self._interval = interval
+        self.peak = 0
+
+    async def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, await asyncio.to_thread(tree_rss, os.getpid()))
+            await asyncio.sleep(self._interval)
+
+    async def __aenter__(self) -> "RssSampler":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._task.cancel()
+        self.peak = max(self.peak, tree_rss(os.getpid()))
+
+
+class BenchResult(BaseModel):
+    cards: int
+    jobs: int = 0
+    evaluated: int = 0
+    applied: int = 0
+    completions: int = 0
+    rate_limited: int = 0
+    seconds: float = 0.0
+    apply_seconds: float = 0.0
+    peak_rss: int = 0
+    requests: int = 0
+    blocked: int = 0
+    bytes: int = 0
+
+    @property
+    def jobs_per_second(self) -> float:
+        return self.jobs / self.seconds if self.seconds else 0.0
+
+    def report(self) -> str:
+        applied = f", 投递: {self.applied}个 ({self.apply_seconds:.1f}秒)" if self.applied else ""
+        evaluated = f", 评判: {self.evaluated}个 (模型调用 {self.completions}次, 被限流 {self.rate_limited}次, {self.evaluated / self.seconds:.2f}个岗位/秒)" if self.evaluated else ""
+        return (
+            f"{self.cards}个卡片: 岗位 {self.jobs}个, 耗时 {self.seconds:.1f}秒, {self.jobs_per_second:.2f}个岗位/秒{evaluated}{applied}, "
+            f"峰值内存 {self.peak_rss / 1048576:.0f} MiB, 请求 {self.requests}, 拦截 {self.blocked}, 传输 {self.bytes / 1048576:.2f} MiB"
+        )
+
+
+def fuzz_salary(n: int, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(n):
+        text = list(rng.choice(real_salaries))
+        for _ in range(rng.randint(1, 4)):
+            op = rng.random()
+            if op < 0.4:
+                text.insert(rng.randint(0, len(text)), rng.choice(salary_noise))
+            elif op < 0.7 and text:
+                del text[rng.randrange(len(text))]
+            elif text:
+                text[rng.randrange(len(text))] = chr(rng.randint(0x20, 0xFFFF))
+        text = "".join(text)
+        try:
+            salary = parse_salary.__wrapped__(decode_salary(encode_salary(text)))
+            if salary and salary.low is not None and not (0 <= salary.low <= salary.high and 12 <= salary.months <= 24):
+                raise ValueError(salary)
+        except Exception as e:
+            failures += 1
+            print(f"解析失败: {text!r}: {e!r}", file=sys.stderr)
+    return failures
+
+
+def micro_bench(n: int) -> None:
+    failures = fuzz_salary(n)
+    print(f"薪资解析模糊测试: {n}个变体, 失败 {failures}个", file=sys.stderr)
+    cards = [encode_salary(s) for s in real_salaries] * (n // len(real_salaries) + 1)
+    for name, parse in (("无缓存", parse_salary.__wrapped__), ("有缓存", parse_salary)):
+        start = time.perf_counter()
+        for card in cards:
+            parse(decode_salary(card))
+        elapsed = time.perf_counter() - start
+        print(f"薪资解码及解析 ({name}): {len(cards) / elapsed:.0f}次/秒, 每次 {elapsed / len(cards) * 1e6:.1f}微秒", file=sys.stderr)
+    jobs = [fake_job("micro", i) for i in range(min(n, 5000))]
+    rng = random.Random(0)
+
+    def repost(desc: str, edits: int) -> str:
+        text = list(desc.replace("岗位编号：micro-", "岗位编号：micro-9"))
+        for _ in range(edits):
+            i = rng.randrange(len(text))
+            op = rng.random()
+            if op < 0.4:
+                text[i] = rng.choice(desc)
+            elif op < 0.7:
+                text.insert(i, rng.choice(desc))
+            else:
+                del text[i]
+        return "".join(text)
+
+    with tempfile.TemporaryDirectory() as workdir, DedupIndex(str(Path(workdir) / "jobs.db")) as index:
+        start = time.perf_counter()
+        clusters = [index.cluster(f"/job_detail/micro_{i}.html", job["brandName"], job["desc"]) for i, job in enumerate(jobs)]
+        elapsed = time.perf_counter() - start
+        duplicates = sum(cluster != f"/job_detail/micro_{i}.html" for i, cluster in enumerate(clusters))
+        print(f"重复检测: {len(jobs)}个不同岗位, 误判为重复 {duplicates}个, 每个岗位 {elapsed / len(jobs) * 1000:.3f}毫秒", file=sys.stderr)
+        for edits in (0, 4, 8):
+            reposts = jobs[:500]
+            found = sum(index.cluster(f"/job_detail/repost{edits}_{i}.html", job["brandName"], repost(job["desc"], edits)) == clusters[i] for i, job in enumerate(reposts))
+            print(f"近似重复召回 (修改岗位编号并随机改动{edits}字): {found}/{len(reposts)}", file=sys.stderr)
+
+
+def search_bench(n: int, repeat: int = 20) -> None:
+    rng = random.Random(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as workdir, JobStore(str(Path(workdir) / "jobs.db")) as store:
+        start = time.perf_counter()
+        for day in range(30):
+            seen = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now - day * 86400))
+            jobs = (fake_job("search", i) for i in range(day, n, 30))
+            store.ingest((dict(company=job["brandName"], title=job["jobName"], salary=decode_salary(job["salaryDesc"]), desc=job["desc"], url=f"/job_detail/{job['encryptJobId']}.html") for job in jobs), seen)
+        elapsed = time.perf_counter() - start
+        print(f"全文索引导入: {n}个岗位, 耗时 {elapsed:.1f}秒, 每个岗位 {elapsed / n * 1000:.3f}毫秒", file=sys.stderr)
+        for i in range(0, n, 3):
+            store.set_evaluation(f"/job_detail/search_{i}.html", rng.choice(ratings))
+        week = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now - 7 * 86400))
+        cases = [
+            ("Kubernetes, 7天内, 月薪≥30K", dict(text="Kubernetes", since=week, salary_floor=SalaryFloor(monthly=30000))),
+            ("大模型 提示词", dict(text="大模型 提示词")),
+            ("Python, 公司: 星河", dict(text="Python", company="星河")),
+            ("asyncio, 评级: EXCELLENT,GOOD", dict(text="asyncio", ratings={"EXCELLENT", "GOOD"})),
+            ("爬虫 (两字，二元组索引)", dict(text="爬虫")),
+            ("Kubernetes 量化", dict(text="Kubernetes 量化")),
+            ("量化 (两字，无匹配)", dict(text="量化")),
+            ("Go (少于3字，逐行匹配)", dict(text="Go")),
+            ("search-4242 (仅1个岗位匹配)", dict(text="search-4242")),
+        ]
+        for name, kwargs in cases:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                matches = store.search(limit=50, **kwargs)
+                times.append(time.perf_counter() - start)
+            total = len(store.search(**kwargs))
+            print(f"全文检索 {name}: 匹配 {total}个, 返回前{len(matches)}个耗时 {statistics.median(times) * 1000:.1f}毫秒", file=sys.stderr)
+
+
+def import_profile(argv: list[str]) -> tuple[float, set[str]]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], capture_output=True, text=True, cwd=Path(__file__).parent)
+    total = 0.0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            total += int(cumulative) / 1e6
+        heavy.update(m for m in ("playwright", "mcp_agent", "openai") if name.strip().split(".")[0] == m)
+    return total, heavy
+
+
+def startup_bench(n: int, budget: float) -> bool:
+    cases = [["--help"], *([name, "--help"] for name in commands)]
+    ok = True
+    for case in cases:
+        argv = ["cli.py", *case]
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *argv], capture_output=True, check=True, cwd=Path(__file__).parent)
+            times.append(time.perf_counter() - start)
+        imports, heavy = import_profile(argv)
+        elapsed = statistics.median(times)
+        ok &= elapsed * 1000 <= budget and not heavy
+        print(f"auto-zhipin {' '.join(case)}: 启动 {elapsed * 1000:.0f}毫秒, 导入 {imports * 1000:.0f}毫秒, 重型依赖: {', '.join(sorted(heavy)) or '无'}", file=sys.stderr)
+    for module in ("playwright.async_api", "mcp_agent.core.fastagent"):
+        imports, _ = import_profile(["-c", f"import {module}"])
+        print(f"参考: 导入{module} {imports * 1000:.0f}毫秒", file=sys.stderr)
+    return ok
+
+
+async def scenario(server: FakeZhipin, cards: int, args: argparse.Namespace, candidate: str) -> BenchResult:
+    server.cards = cards
+    server.completions = 0
+    server.rejected = 0
+    result = BenchResult(cards=cards)
+    pending = []
+    batch = []
+    workers = asyncio.Semaphore(args.workers)
+
+    async def evaluate(descriptions: list[str]) -> None:
+        async with workers:
+            if args.batch_size > 1:
+                await evaluator.evaluate_batch(candidate, descriptions, args.batch_size)
+            else:
+                await evaluator.evaluate(candidate, descriptions[0])
+        result.evaluated += len(descriptions)
+
+    async with RssSampler() as sampler:
+        async with BossZhipin(headless_cb=print, block=not args.no_block, stats=True) as zhipin, JobEvaluator(cascade=cascade_options(args)) if args.eval else nullcontext() as evaluator:
+            start = time.perf_counter()
+            jobs = []
+            async for job in zhipin.query_jobs(
+                query = f"bench-{cards}",
+                city = "100010000",
+                scroll_n = max(0, -(-cards // server.page_size) - 1),
+                filter_tags = {"派遣", "猎头"},
+                capture = not args.no_capture,
+                salary_floor = SalaryFloor(monthly=args.min_salary * 1000) if args.min_salary else None,
+            ):
+                jobs.append(job.model_dump())
+                if evaluator:
+                    batch.append(job.description())
+                    if len(batch) >= args.batch_size:
+                        pending.append(asyncio.create_task(evaluate(batch)))
+                        batch = []
+            if evaluator and batch:
+                pending.append(asyncio.create_task(evaluate(batch)))
+            await asyncio.gather(*pending)
+            result.seconds = time.perf_counter() - start
+            result.jobs = len(jobs)
+            if args.apply > 0:
+                start = time.perf_counter()
+                async for hr in zhipin.apply_jobs(jobs[:args.apply]):
+                    await hr.send("您好，我对该岗位很感兴趣，期待进一步沟通。")
+                    result.applied += 1
+                result.apply_seconds = time.perf_counter() - start
+            result.requests = zhipin.route_stats.requests
+            result.blocked = zhipin.route_stats.blocked
+            result.bytes = zhipin.route_stats.bytes
+    result.completions = server.completions
+    result.rate_limited = server.rejected
+    result.peak_rss = sampler.peak
+    return result
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description="使用本地模拟站点及模拟模型进行离线基准测试。")
+    cliparser.add_argument("--cards", help="各场景的岗位卡片数量 (逗号分隔，默认: 50,500,5000)", type=str, default="50,500,5000")
+    cliparser.add_argument("--page_size", help="每次滚动加载的岗位卡片数量 (默认: 15)", type=int, default=15)
+    cliparser.add_argument("--latency", help="模拟站点的响应延迟，单位为毫秒 (默认: 20)", type=float, default=20)
+    cliparser.add_argument("--llm_latency", help="模拟模型的响应延迟，单位为毫秒 (默认: 200)", type=float, default=200)
+    cliparser.add_argument("--llm_429", help="模拟模型随机返回429的比例 (0~1，默认: 0)", type=float, default=0.0)
+    cliparser.add_argument("--llm_rpm", help="模拟模型每分钟允许的请求次数，超出时返回429 (默认不限)", type=float)
+    cliparser.add_argument("--llm_invalid", help="模拟模型返回无法解析的JSON的比例 (0~1，默认: 0)", type=float, default=0.0)
+    cliparser.add_argument("--eval", help="使用模拟模型评判抓取到的岗位", action="store_true")
+    cliparser.add_argument("--resume", help="评判时使用的简历文件路径 (默认: 内置示例简历)", type=str)
+    cliparser.add_argument("--full_resume", help="在提示词中使用完整简历，而不是提炼后的求职者档案", action="store_true")
+    cliparser.add_argument("-w", "--workers", help="并发评判岗位的数量 (默认: 4)", type=int, default=4)
+    cliparser.add_argument("--batch_size", help="单次请求最多评判的岗位数量 (默认: 1)", type=int, default=1)
+    add_cascade_args(cliparser)
+    cliparser.set_defaults(strong_model="generic.stub-strong")
+    add_ratelimit_args(cliparser)
+    cliparser.add_argument("--min_salary", help="最低月薪，单位为K，低于该值的岗位在卡片列表中直接跳过", type=float)
+    cliparser.add_argument("--apply", help="每个场景投递的岗位数量，发送前的随机等待会计入耗时 (默认: 0)", type=int, default=0)
+    cliparser.add_argument("--no_block", help="不拦截图片、字体等无关资源", action="store_true")
+    cliparser.add_argument("--no_capture", help="禁用接口数据截获，逐个点击岗位卡片读取详情", action="store_true")
+    cliparser.add_argument("--micro", help="仅运行薪资解析模糊测试及薪资解析、重复检测微基准测试，指定变体数量", type=int)
+    cliparser.add_argument("--search", help="仅运行岗位全文检索基准测试，指定导入的岗位数量", type=int)
+    cliparser.add_argument("--startup", help="仅运行命令行启动耗时测试，指定每个命令的运行次数", type=int)
+    cliparser.add_argument("--startup_budget", help="--help的启动耗时上限，单位为毫秒，超出或加载了Playwright、fast-agent时以非零状态退出 (默认: 1000)", type=float, default=1000)
+    cliparser.add_argument("--trace", help="将各阶段耗时及tokens用量写入JSONL文件，并在结束时输出汇总", type=str)
+    cliparser.add_argument("-O", "--output", help="基准测试结果JSON文件输出路径", type=str)
+    args, _ = cliparser.parse_known_args()
+    configure_limits(args)
+    if args.micro:
+        micro_bench(args.micro)
+        sys.exit(0)
+    if args.search:
+        search_bench(args.search)
+        sys.exit(0)
+    if args.startup:
+        sys.exit(0 if startup_bench(args.startup, args.startup_budget) else 1)
+
+    async def main() -> None:
+        if args.resume:
+            with open(args.resume, "r") as f:
+                resume = f.read()
+        else:
+            resume = "# 求职者\n\n- 5年Python后端开发经验，熟悉asyncio、FastAPI与Playwright\n- 熟悉MySQL、Redis、Docker\n- 期望岗位：后端开发工程师，期望薪资：25-35K"
+        trace = Path(args.trace).resolve() if args.trace else None
+        output = Path(args.output).resolve() if args.output else None
+        results = []
+        cwd = Path.cwd()
+        with FakeZhipin(page_size=args.page_size, latency=args.latency / 1000, llm_latency=args.llm_latency / 1000, llm_429=args.llm_429, llm_rpm=args.llm_rpm, llm_invalid=args.llm_invalid) as server, tempfile.TemporaryDirectory() as workdir:
+            boss_zhipin.base_url = server.url
+            # fast-agent discovers its config from the working directory.
+            stub_config(Path(workdir) / "fastagent.config.yaml", server)
+            os.chdir(workdir)
+            try:
+                with traced(str(trace) if trace else None):
+                    candidate = await describe_candidate(resume, args.full_resume) if args.eval else ""
+                    for cards in (int(n) for n in args.cards.split(",")):
+                        result = await scenario(server, cards, args, candidate)
+                        results.append(result)
+                        print(result.report(), file=sys.stderr)
+                        if limiter.troubled():
+                            print(limiter.report(), file=sys.stderr)
+            finally:
+                os.chdir(cwd)
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump([dict(r.model_dump(), jobs_per_second=r.jobs_per_second) for r in results], f, ensure_ascii=False, indent=4)
+
+    asyncio.run(main())
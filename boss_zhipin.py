@@ -1,15 +1,36 @@
 import re
 import json
+import time
 import random
+import asyncio
 from pathlib import Path
 from typing import Callable
-from urllib.parse import urlencode, quote
-from typing import AsyncGenerator
-from playwright.async_api import BrowserContext, Page, Locator, async_playwright, expect
-from pydantic import BaseModel
+from urllib.parse import urlencode, urlparse, quote
+from typing import AsyncGenerator, AsyncIterable, AsyncIterator, Iterable
+from contextlib import asynccontextmanager, nullcontext
+from playwright.async_api import BrowserContext, Page, Locator, Response, Route, async_playwright, expect
+from pydantic import BaseModel, model_validator
+from job_store import JobStore
+from salary import Salary, SalaryFloor, parse_salary
+from utils import as_async
+from tracing import span, count
 
 
 base_url = "https://www.zhipin.com"
+card_script = """cards => cards.map(c => ({
+    url: c.querySelector(".job-name")?.getAttribute("href"),
+    title: c.querySelector(".job-name")?.innerText,
+    salary: c.querySelector(".job-salary")?.innerText,
+    company: c.querySelector(".boss-name")?.innerText,
+    tag: (t => t?.checkVisibility() ? t.getAttribute("alt") : null)(c.querySelector(".job-tag-icon")),
+}))"""
+detail_script = """jd => ({
+    title: jd.querySelector(".job-name")?.innerText,
+    salary: jd.querySelector(".job-salary")?.innerText,
+    desc: jd.querySelector(".desc")?.innerText,
+    active: (a => a?.checkVisibility() ? a.innerText : "")(jd.querySelector(".job-boss-info .boss-active-time")),
+    favorable: !!jd.querySelector(".op-btn.op-btn-like:not(.active)")?.checkVisibility(),
+})"""
 salary_mapping = {
     chr(0xE031): "0",
     chr(0xE032): "1",
@@ -24,6 +45,37 @@ salary_mapping = {
 }
 
 
+class RoutePolicy(BaseModel):
+    resource_types: set[str] = {"image", "font", "media"}
+    hosts: set[str] = {
+        "hm.baidu.com",
+        "googletagmanager.com",
+        "google-analytics.com",
+        "doubleclick.net",
+        "cnzz.com",
+        "growingio.com",
+        "sensorsdata.cn",
+    }
+    allow: list[str] = ["qrcode"]
+
+    def blocks(self, url: str, resource_type: str) -> bool:
+        if any(pattern in url for pattern in self.allow):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        host = urlparse(url).hostname or ""
+        return any(host == h or host.endswith(f".{h}") for h in self.hosts)
+
+
+class RouteStats(BaseModel):
+    requests: int = 0
+    blocked: int = 0
+    bytes: int = 0
+
+    def report(self) -> str:
+        return f"请求: {self.requests}, 拦截: {self.blocked}, 传输: {self.bytes / 1048576:.2f} MiB"
+
+
 async def load_cookies(context: BrowserContext, cookies_path: Path) -> None:
     if cookies_path.exists():
         with open(cookies_path, "r") as f:
@@ -37,9 +89,19 @@ async def dump_cookies(context: BrowserContext, cookies_path: Path) -> None:
         json.dump({"cookies": cookies}, f)
 
 
+async def logged_in(context: BrowserContext) -> bool:
+    response = await context.request.get(f"{base_url}/wapi/zpuser/wap/getUserInfo.json")
+    if not response.ok:
+        return False
+    try:
+        return (await response.json()).get("code") == 0
+    except ValueError:
+        return False
+
+
 async def login(context: BrowserContext, page: Page, cookies_path: Path, headless_cb: Callable[[str], None] | None = None) -> bool:
     await load_cookies(context, cookies_path)
-    await page.goto(f"{base_url}/web/user/?ka=header-login", wait_until="networkidle")
+    await page.goto(f"{base_url}/web/user/?ka=header-login", wait_until="domcontentloaded")
     figure = page.locator(".nav-figure")
     for _ in range(300):
         if await figure.is_visible():
@@ -63,6 +125,106 @@ def decode_salary(salary: str) -> str:
     return "".join(salary_mapping[c] if c in salary_mapping else c for c in salary)
 
 
+def job_id(url: str | None) -> str | None:
+    if url:
+        m = re.search(r"/job_detail/([^/?#]+?)\.html", url)
+        if m:
+            return m.group(1)
+    return None
+
+
+class JobCapture:
+    _list: dict[str, dict]
+    _detail: dict[str, dict]
+    _fetch_ok: bool
+
+    def __init__(self, page: Page):
+        self._page = page
+        self._list = {}
+        self._detail = {}
+        self._fetch_ok = True
+        page.on("response", self._on_response)
+
+    def __enter__(self) -> "JobCapture":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._page.remove_listener("response", self._on_response)
+
+    async def _on_response(self, response: Response) -> None:
+        if "/wapi/zpgeek/search/joblist.json" in response.url:
+            data = await self._payload(response)
+            for item in data.get("jobList") or []:
+                if item.get("encryptJobId"):
+                    self._list[item["encryptJobId"]] = item
+        elif "/wapi/zpgeek/job/detail.json" in response.url:
+            self._add_detail(await self._payload(response))
+
+    @staticmethod
+    async def _payload(response: Response) -> dict:
+        try:
+            body = await response.json()
+        except Exception:
+            return {}
+        if body.get("code") != 0:
+            return {}
+        return body.get("zpData") or {}
+
+    def _add_detail(self, data: dict) -> None:
+        info = data.get("jobInfo") or {}
+        if info.get("encryptId"):
+            self._detail[info["encryptId"]] = data
+
+    def item(self, id: str) -> dict | None:
+        return self._list.get(id)
+
+    async def detail(self, id: str) -> dict | None:
+        if id in self._detail:
+            return self._detail[id]
+        item = self._list.get(id)
+        if not self._fetch_ok or not item or not item.get("securityId"):
+            return None
+        params = dict(securityId=item["securityId"], lid=item.get("lid", ""))
+        response = await self._page.request.get(f"{base_url}/wapi/zpgeek/job/detail.json?{urlencode(params)}")
+        try:
+            body = await response.json() if response.ok else {}
+        except Exception:
+            body = {}
+        if body.get("code") != 0:
+            # Anti-crawl tokens are missing or expired; clicking the card still works.
+            self._fetch_ok = False
+            return None
+        self._add_detail(body.get("zpData") or {})
+        return self._detail.get(id)
+
+    @staticmethod
+    def tag(item: dict) -> str | None:
+        if item.get("goldHunter"):
+            return "猎头"
+        if item.get("proxyJob"):
+            return "派遣"
+        return item.get("iconWord") or None
+
+    @staticmethod
+    def info(item: dict | None, detail: dict, url: str) -> "Job.Info | None":
+        job = detail.get("jobInfo") or {}
+        company = (detail.get("brandComInfo") or {}).get("brandName") or (item or {}).get("brandName")
+        title = job.get("jobName")
+        salary = job.get("salaryDesc")
+        desc = job.get("postDescription")
+        if not (company and title and salary and desc):
+            return None
+        return Job.Info(company=company, title=title, salary=decode_salary(salary), desc=desc, url=url)
+
+    @staticmethod
+    def active_time(detail: dict) -> str:
+        return (detail.get("bossInfo") or {}).get("activeTimeDesc") or ""
+
+    @staticmethod
+    def favored(detail: dict) -> bool:
+        return bool((detail.get("relationInfo") or {}).get("interestJob"))
+
+
 class Job:
     class Info(BaseModel):
         company: str
@@ -70,6 +232,14 @@ class Job:
         salary: str
         desc: str
         url: str
+        cluster: str | None = None
+        salary_range: Salary | None = None
+
+        @model_validator(mode="after")
+        def parse_salary_range(self) -> "Job.Info":
+            if self.salary_range is None:
+                self.salary_range = parse_salary(self.salary)
+            return self
 
         def description(self) -> str:
             return f"<company>{self.company}</company>\n<title>{self.title}</title>\n<salary>{self.salary}</salary>\n<description>\n{self.desc}\n</description>"
@@ -77,22 +247,43 @@ class Job:
     _info: Info
     _jd: Locator
     _favor: Locator
+    _card: Locator | None
+    _lock: asyncio.Lock | None
 
-    def __init__(self, info: Info, jd: Locator, favor: Locator):
+    def __init__(self, info: Info, jd: Locator, favor: Locator, card: Locator | None = None, lock: asyncio.Lock | None = None):
         self._info = info
         self._jd = jd
         self._favor = favor
+        self._card = card
+        self._lock = lock
+
+    @property
+    def url(self) -> str:
+        return self._info.url
+
+    @property
+    def cluster(self) -> str | None:
+        return self._info.cluster
+
+    @cluster.setter
+    def cluster(self, cluster: str | None) -> None:
+        self._info.cluster = cluster
 
     def description(self) -> str:
         return self._info.description()
 
     def model_dump(self) -> dict[str, str]:
-        return self._info.model_dump()
+        return self._info.model_dump(exclude_none=True)
 
     async def favor(self) -> None:
-        await self._favor.click(delay=random.randint(32, 512))
-        await expect(self._jd.locator(".op-btn.op-btn-like.active")).to_be_visible()
-        await self._jd.page.wait_for_timeout(random.randint(1024, 2048))
+        async with self._lock or nullcontext():
+            with span("job.favor"):
+                if self._card:
+                    await self._card.click(delay=random.randint(32, 512))
+                    await expect(self._jd.locator(".job-name")).to_have_text(self._info.title)
+                await self._favor.click(delay=random.randint(32, 512))
+                await expect(self._jd.locator(".op-btn.op-btn-like.active")).to_be_visible()
+                await self._jd.page.wait_for_timeout(random.randint(1024, 2048))
 
 
 class HrDialog:
@@ -103,104 +294,215 @@ class HrDialog:
         self._info = info
         self._dialog = dialog
 
+    @property
+    def url(self) -> str:
+        return self._info.url
+
     def description(self) -> str:
         return self._info.description()
 
     async def send(self, letter: str) -> None:
-        await self._dialog.locator(".input-area").fill(letter)
-        send = self._dialog.locator(".send-message:not(.disable)")
-        await expect(send).to_be_visible()
-        await self._dialog.page.wait_for_timeout(random.randint(128, 8192))
-        await send.click(delay=random.randint(32, 512))
-        await expect(self._dialog.locator(".send-message.disable")).to_be_visible()
+        with span("apply.send"):
+            await self._dialog.locator(".input-area").fill(letter)
+            send = self._dialog.locator(".send-message:not(.disable)")
+            await expect(send).to_be_visible()
+            await self._dialog.page.wait_for_timeout(random.randint(128, 8192))
+            await send.click(delay=random.randint(32, 512))
+            await expect(self._dialog.locator(".send-message.disable")).to_be_visible()
+        count("applied")
 
 
 class BossZhipin:
     _cookies_path: Path
+    _max_pages: int
+    _idle: list[Page]
 
-    def __init__(self, cookies_path: str = "cookies.json", headless_cb: Callable[[str], None] | None = None):
+    def __init__(self, cookies_path: str = "cookies.json", headless_cb: Callable[[str], None] | None = None, max_pages: int = 1, route_policy: RoutePolicy | None = None, block: bool = True, stats: bool = False, login_ttl: float | None = None):
         self._cookies_path = Path(cookies_path).resolve()
         self._headless_cb = headless_cb
+        self._max_pages = max_pages
+        self._route_policy = (route_policy or RoutePolicy()) if block else None
+        self._stats = stats
+        self._login_ttl = login_ttl
+        self._idle = []
+        self._logged_in = None
+        self._login_checked = 0.0
+        self.route_stats = RouteStats()
 
-    async def query_jobs(self, query: str, city: str, salary: str | None = None, scroll_n: int = 8, filter_tags: set[str] | None = None, blacklist: set[str] | None = None) -> AsyncGenerator[Job, None]:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
+    async def __aenter__(self) -> "BossZhipin":
+        with span("chromium.launch"):
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(
                 headless = True if self._headless_cb else False,
                 args = ["--disable-blink-features=AutomationControlled"]
             )
-            context = await browser.new_context()
-            page = await context.new_page()
-            if not await login(context, page, self._cookies_path, self._headless_cb):
+            self._context = await self._browser.new_context()
+        await load_cookies(self._context, self._cookies_path)
+        if self._stats:
+            # Byte counts cost a round trip to the browser per response, so they are only taken when reported.
+            self._context.on("response", self._on_response)
+        if self._route_policy:
+            await self._context.route("**/*", self._route)
+        self._slots = asyncio.Semaphore(self._max_pages)
+        self._login_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._logged_in:
+            await dump_cookies(self._context, self._cookies_path)
+        await self._browser.close()
+        await self._playwright.stop()
+
+    async def _route(self, route: Route) -> None:
+        if self._route_policy.blocks(route.request.url, route.request.resource_type):
+            self.route_stats.blocked += 1
+            await route.abort()
+        else:
+            await route.fallback()
+
+    async def _on_response(self, response: Response) -> None:
+        self.route_stats.requests += 1
+        try:
+            # Chunked and compressed responses have no content-length; sizes() reports what went over the wire.
+            sizes = await response.request.sizes()
+            self.route_stats.bytes += max(0, sizes["responseBodySize"]) + max(0, sizes["responseHeadersSize"])
+        except Exception:
+            self.route_stats.bytes += int(response.headers.get("content-length") or 0)
+
+    async def _login(self, page: Page) -> bool:
+        async with self._login_lock:
+            expired = self._login_ttl is not None and time.monotonic() - self._login_checked > self._login_ttl
+            if self._logged_in is None or expired:
+                with span("login.check"):
+                    self._logged_in = await logged_in(self._context)
+                if self._logged_in and expired:
+                    await dump_cookies(self._context, self._cookies_path)
+                if not self._logged_in:
+                    with span("login"):
+                        self._logged_in = await login(self._context, page, self._cookies_path, self._headless_cb)
+                self._login_checked = time.monotonic()
+            return self._logged_in
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page | None]:
+        async with self._slots:
+            page = self._idle.pop() if self._idle else await self._context.new_page()
+            try:
+                yield page if await self._login(page) else None
+            finally:
+                if not page.is_closed():
+                    self._idle.append(page)
+
+    async def query_jobs(self, query: str, city: str, salary: str | None = None, scroll_n: int = 8, filter_tags: set[str] | None = None, blacklist: set[str] | None = None, capture: bool = True, store: JobStore | None = None, known_run: int = 0, require_rating: bool = False, seen: set[str] | None = None, salary_floor: SalaryFloor | None = None, page: Page | None = None) -> AsyncGenerator[Job, None]:
+        async with self.page() if page is None else nullcontext(page) as page:
+            if page is None:
                 return
-            params = dict(query=query, city=city)
-            if salary:
-                params["salary"] = salary
-            await page.goto(f"{base_url}/web/geek/jobs?{urlencode(params, quote_via=quote)}")
-            prev_h = 0
-            container = page.locator(".job-list-container")
-            await expect(container).to_be_visible()
-            await container.hover()
-            for _ in range(scroll_n):
-                bbox = await container.bounding_box()
-                await page.mouse.wheel(0, bbox["height"] - prev_h)
-                loading = container.locator(".loading-wait")
-                try:
-                    await expect(loading).to_be_visible()
-                    await expect(loading).to_be_hidden()
-                    if bbox["height"] > prev_h:
-                        prev_h = bbox["height"]
-                    else:
+            with JobCapture(page) if capture else nullcontext() as capture:
+                params = dict(query=query, city=city)
+                if salary:
+                    params["salary"] = salary
+                container = page.locator(".job-list-container")
+                with span("search.goto", query=query):
+                    await page.goto(f"{base_url}/web/geek/jobs?{urlencode(params, quote_via=quote)}")
+                    await expect(container).to_be_visible()
+                await container.hover()
+                prev_h = 0
+                cards = container.locator(".job-card-box")
+                for _ in range(scroll_n):
+                    if store and known_run > 0:
+                        tail = (await cards.evaluate_all(card_script))[-known_run:]
+                        if len(tail) == known_run and all(store.known(c["url"], c["title"], decode_salary(c["salary"] or ""), require_rating) or store.rejected(c["url"]) for c in tail):
+                            break
+                    bbox = await container.bounding_box()
+                    await page.mouse.wheel(0, bbox["height"] - prev_h)
+                    loading = container.locator(".loading-wait")
+                    try:
+                        with span("wait.loading"):
+                            await expect(loading).to_be_visible()
+                            await expect(loading).to_be_hidden()
+                        if bbox["height"] > prev_h:
+                            prev_h = bbox["height"]
+                        else:
+                            break
+                    except AssertionError:
                         break
-                except AssertionError:
-                    break
-            jobs = await container.locator(".job-card-box").all()
-            for job in jobs:
-                if filter_tags:
-                    tag = job.locator(".job-tag-icon")
-                    if await tag.is_visible() and await tag.get_attribute("alt") in filter_tags:
-                        continue
-                company = job.locator(".boss-name")
-                await job.click(delay=random.randint(32, 512))
                 jd = page.locator(".job-detail-box")
                 favor = jd.locator(".op-btn.op-btn-like:not(.active)")
-                title = jd.locator(".job-name")
-                salary = jd.locator(".job-salary")
-                desc = jd.locator(".desc")
-                boss = jd.locator(".job-boss-info")
-                await expect(desc).to_be_visible()
-                await expect(boss).to_be_visible()
-                active = boss.locator(".boss-active-time")
-                if await active.is_visible() and re.search(r"[周月年]", await active.inner_text()):
-                    continue
-                if await favor.is_visible():
-                    company_name = await company.inner_text()
-                    if not blacklist or company_name not in blacklist:
-                        yield Job(Job.Info(
-                            company = company_name,
-                            title = await title.inner_text(),
-                            salary = decode_salary(await salary.inner_text()),
-                            desc = await desc.inner_text(),
-                            url = await job.locator(".job-name").get_attribute("href"),
-                        ), jd, favor)
-
-    async def apply_jobs(self, jobs: list[dict[str, str]]) -> AsyncGenerator[HrDialog, None]:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless = True if self._headless_cb else False,
-                args = ["--disable-blink-features=AutomationControlled"]
-            )
-            context = await browser.new_context()
-            page = await context.new_page()
-            if not await login(context, page, self._cookies_path, self._headless_cb):
+                lock = asyncio.Lock()
+
+                async def extract(card: Locator, meta: dict) -> Job.Info | None:
+                    jid = job_id(meta["url"]) if capture else None
+                    item = capture.item(jid) if jid else None
+                    if item and filter_tags and JobCapture.tag(item) in filter_tags:
+                        return None
+                    with span("card.fetch_detail"):
+                        detail = await capture.detail(jid) if jid else None
+                    info = JobCapture.info(item, detail, meta["url"]) if detail else None
+                    if info:
+                        if re.search(r"[周月年]", JobCapture.active_time(detail)) or JobCapture.favored(detail):
+                            return None
+                        return info
+                    with span("card.click"):
+                        await card.click(delay=random.randint(32, 512))
+                    with span("wait.detail"):
+                        await expect(jd.locator(".desc")).to_be_visible()
+                        await expect(jd.locator(".job-boss-info")).to_be_visible()
+                    with span("card.read"):
+                        detail = await jd.evaluate(detail_script)
+                    if re.search(r"[周月年]", detail["active"]) or not detail["favorable"]:
+                        return None
+                    with span("decode_salary"):
+                        salary = decode_salary(detail["salary"])
+                    return Job.Info(
+                        company = meta["company"],
+                        title = detail["title"],
+                        salary = salary,
+                        desc = detail["desc"],
+                        url = meta["url"],
+                    )
+
+                with span("search.cards"):
+                    metas = await cards.evaluate_all(card_script)
+                for card, meta in zip(await cards.all(), metas):
+                    if store and store.known(meta["url"], meta["title"], decode_salary(meta["salary"] or ""), require_rating):
+                        store.touch(meta["url"])
+                        continue
+                    if seen and meta["url"] in seen:
+                        continue
+                    if filter_tags and meta["tag"] in filter_tags:
+                        info = None
+                    elif blacklist and meta["company"] in blacklist:
+                        info = None
+                    elif salary_floor and not salary_floor.accepts(parse_salary(decode_salary(meta["salary"] or ""))):
+                        info = None
+                    else:
+                        async with lock:
+                            with span("card.extract"):
+                                info = await extract(card, meta)
+                    if not info or (blacklist and info.company in blacklist):
+                        # Rejected cards are never stored as jobs, so remember them for the known_run check.
+                        if store:
+                            store.reject(meta["url"])
+                        continue
+                    if store:
+                        store.upsert(info)
+                    count("jobs")
+                    yield Job(info, jd, favor, card, lock)
+
+    async def apply_jobs(self, jobs: Iterable[dict[str, str]] | AsyncIterable[dict[str, str]]) -> AsyncGenerator[HrDialog, None]:
+        async with self.page() as page:
+            if page is None:
                 return
-            for job in jobs:
+            async for job in as_async(jobs):
                 job_info = Job.Info.model_validate(job)
-                await page.goto(f"{base_url}{job_info.url}", wait_until="networkidle")
                 primary = page.locator(".info-primary")
-                await expect(primary).to_be_visible()
+                with span("apply.goto"):
+                    await page.goto(f"{base_url}{job_info.url}", wait_until="domcontentloaded")
+                    await expect(primary).to_be_visible()
                 apply = primary.get_by_role("link", name="立即沟通")
                 if await apply.is_visible():
-                    await apply.click(delay=random.randint(32, 512))
                     dialog = page.locator(".dialog-container")
-                    await expect(dialog).to_be_visible()
+                    with span("apply.open_dialog"):
+                        await apply.click(delay=random.randint(32, 512))
+                        await expect(dialog).to_be_visible()
                     yield HrDialog(job_info, dialog)
@@ -0,0 +1,37 @@
+import sys
+import asyncio
+import argparse
+import importlib
+
+
+commands = {
+    "query": ("query", "查询匹配的岗位，可选评判并收藏"),
+    "apply": ("apply", "针对收藏的岗位撰写沟通文案并自动发起沟通"),
+    "watch": ("watch", "常驻运行，定时执行保存的查询"),
+    "eval": ("job_eval", "评判标准输入中的岗位描述"),
+    "write": ("job_writer", "针对标准输入中的岗位描述撰写沟通文案"),
+    "profile": ("resume", "将简历提炼为结构化的求职者档案"),
+    "ingest": ("ingest", "将岗位列表文件导入岗位数据库并建立全文索引"),
+    "search": ("search", "在岗位数据库中全文检索岗位并导出"),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    cliparser = argparse.ArgumentParser(prog="auto-zhipin", description="BOSS直聘岗位查询、评判及自动沟通工具。")
+    subparsers = cliparser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    parsers = {name: subparsers.add_parser(name, help=help) for name, (_, help) in commands.items()}
+    # Only the chosen command's module is imported, so Playwright and fast-agent load when it needs them.
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    if command in commands:
+        module = importlib.import_module(commands[command][0])
+        parsers[command].description = module.description
+        module.add_arguments(parsers[command])
+    args, _ = cliparser.parse_known_args(argv)
+    if hasattr(module, "check_args"):
+        module.check_args(parsers[command], args)
+    asyncio.run(module.main(args))
+
+
+if __name__ == "__main__":
+    main()
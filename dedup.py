@@ -0,0 +1,124 @@
+import re
+import random
+import hashlib
+import sqlite3
+import unicodedata
+from array import array
+from pathlib import Path
+from functools import lru_cache
+
+
+non_word = re.compile(r"[^a-z0-9一-鿿]+")
+num_bins = 64
+# 16 bands of 4 rows: pairs above 0.6 similarity share a band with probability over 0.87, above 0.8 over 0.999.
+band_rows = 4
+# Empty bins borrow from the first non-empty bin along a fixed probe order, so similar texts borrow alike.
+probes = [random.Random(i).sample(range(num_bins), num_bins) for i in range(num_bins)]
+
+
+def normalize(text: str) -> str:
+    return non_word.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def shingles(text: str, k: int = 3) -> set[str]:
+    text = normalize(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return set(text[i:i + k] for i in range(len(text) - k + 1))
+
+
+@lru_cache(maxsize=1 << 16)
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(text: str) -> list[int]:
+    # One-permutation MinHash: a single hash per shingle, its low bits pick a bin and each bin keeps its minimum.
+    bins = [None] * num_bins
+    for shingle in shingles(text):
+        h = _hash(shingle)
+        i = h % num_bins
+        if bins[i] is None or h < bins[i]:
+            bins[i] = h
+    if all(b is None for b in bins):
+        return [0] * num_bins
+    return [b if b is not None else next(bins[j] for j in probes[i] if bins[j] is not None) for i, b in enumerate(bins)]
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _signed(h: int) -> int:
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def bands(signature: list[int]) -> list[int]:
+    keys = []
+    for i in range(0, len(signature), band_rows):
+        band = array("Q", [i, *signature[i:i + band_rows]]).tobytes()
+        keys.append(_signed(int.from_bytes(hashlib.blake2b(band, digest_size=8).digest(), "little")))
+    return keys
+
+
+class DedupIndex:
+    _conn: sqlite3.Connection
+    _threshold: float
+
+    def __init__(self, path: str = "jobs.db", threshold: float = 0.8):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self._conn = sqlite3.connect(Path(path).resolve())
+        self._conn.executescript("""
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+DROP TABLE IF EXISTS simhash;
+CREATE TABLE IF NOT EXISTS minhash (
+    url TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    cluster TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_band (
+    company TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS minhash_band_key ON minhash_band (company, key);
+CREATE INDEX IF NOT EXISTS minhash_band_url ON minhash_band (url);
+""")
+        self._threshold = threshold
+
+    def __enter__(self) -> "DedupIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def find(self, company: str, signature: list[int], exclude: str | None = None) -> str | None:
+        keys = bands(signature)
+        rows = self._conn.execute(
+            f"SELECT url, signature, cluster FROM minhash WHERE url IN (SELECT url FROM minhash_band WHERE company = ? AND key IN ({', '.join('?' * len(keys))})) ORDER BY rowid",
+            (company, *keys)
+        ).fetchall()
+        for url, other, cluster in rows:
+            if url != exclude and similarity(signature, array("Q", other)) >= self._threshold:
+                return cluster
+        return None
+
+    def cluster(self, url: str, company: str, desc: str) -> str:
+        company = normalize(company)
+        signature = minhash(desc)
+        blob = array("Q", signature).tobytes()
+        row = self._conn.execute("SELECT signature, cluster FROM minhash WHERE url = ?", (url,)).fetchone()
+        if row and row[0] == blob:
+            return row[1]
+        cluster = self.find(company, signature, url) or url
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO minhash (url, company, signature, cluster) VALUES (?, ?, ?, ?)", (url, company, blob, cluster))
+            self._conn.execute("DELETE FROM minhash_band WHERE url = ?", (url,))
+            self._conn.executemany("INSERT INTO minhash_band (company, key, url) VALUES (?, ?, ?)", ((company, key, url) for key in bands(signature)))
+        return cluster
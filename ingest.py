@@ -0,0 +1,46 @@
+import re
+import sys
+import glob
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+from job_store import JobStore
+from job_stream import read_jobs
+
+
+timestamp_pattern = re.compile(r"(\d{8})_(\d{6})")
+
+
+def seen_at(path: Path) -> str:
+    m = timestamp_pattern.search(path.stem)
+    if m:
+        return datetime.strptime("".join(m.groups()), "%Y%m%d%H%M%S").isoformat(timespec="seconds")
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec="seconds")
+
+
+description = "将查询输出的岗位列表导入岗位数据库，并建立全文索引。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("paths", help="岗位列表文件路径，支持通配符 (支持.json及.jsonl，例如: jobs_*.json*)", type=str, nargs="*")
+    cliparser.add_argument("--db", help="岗位数据库文件路径 (默认: jobs.db)", type=str, default="jobs.db")
+    cliparser.add_argument("--rebuild", help="重建全文索引 (数据库执行过VACUUM后需要重建)", action="store_true")
+
+
+async def main(args: argparse.Namespace) -> None:
+    paths = sorted(set(Path(p) for pattern in args.paths for p in (glob.glob(pattern) or [pattern])))
+    with JobStore(args.db) as store:
+        if args.rebuild:
+            store.rebuild_index()
+        for path in paths:
+            jobs = [job async for job in read_jobs(str(path))]
+            total, changed = store.ingest(jobs, seen_at(path))
+            print(f"{path}: {total}个岗位, 新增或变化 {changed}个", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
@@ -1,9 +1,20 @@
 from datetime import date
-from pydantic import BaseModel
-from typing import Callable, Awaitable
-from mcp_agent.core.fastagent import FastAgent
-from mcp_agent.core.request_params import RequestParams
-from utils import remove_json_fences
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pydantic import BaseModel, Field, ValidationError
+from typing import TYPE_CHECKING, Callable, Awaitable, Literal
+from contextlib import AsyncExitStack
+from llm_cache import LLMCache, add_cache_args, open_cache
+from resume import add_profile_args, describe_candidate
+from utils import remove_json_fences, model_name, estimate_tokens, request_params
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from tracing import llm, count
+
+if TYPE_CHECKING:
+    from mcp_agent.core.request_params import RequestParams
 
 
 class Evaluator(BaseModel):
@@ -18,17 +29,20 @@ class Evaluator(BaseModel):
 6. 工作与生活平衡: 岗位是否提供足够的工作与生活平衡，避免过度加班或高压环境？求职者是否可以在该岗位上保持健康的工作节奏？
 
 请针对每项标准提供评级 (EXCELLENT, GOOD, FAIR, or POOR)。"""
+    use_history: bool = False
 
     @staticmethod
-    def request_params() -> RequestParams:
-        return RequestParams(maxTokens=8192, temperature=0.4)
+    def request_params() -> "RequestParams":
+        return request_params(
+            maxTokens = 8192,
+            temperature = 0.4,
+            use_history = False
+        )
 
     @staticmethod
-    def prompt(resume: str, job_description: str) -> str:
+    def prompt(candidate: str, job_description: str) -> str:
         today = str(date.today())
-        return f"""<bio-resume>
-{resume}
-</bio-resume>
+        return f"""{candidate}
 
 <job-description>
 {job_description}
@@ -57,41 +71,394 @@ IMPORTANT: Your response should be ONLY the JSON object without any code fences,
     use_history: bool = False
 
     @staticmethod
-    def request_params() -> RequestParams:
-        return RequestParams(
+    def request_params() -> "RequestParams":
+        return request_params(
+            maxTokens = 8192,
+            temperature = 0.4,
+            use_history = False
+        )
+
+
+class BatchEvaluator(BaseModel):
+    name: str = "batch_eval"
+    instruction: str = Evaluator().instruction.removesuffix("请针对每项标准提供评级 (EXCELLENT, GOOD, FAIR, or POOR)。") + """你将一次收到多个岗位，请逐个岗位独立评判，并综合各项标准给出总体评级。
+
+Your response MUST be a valid JSON array with exactly one entry per job, matching this exact format (no other text, markdown, or explanation):
+
+[{"id":ID,"rating":"RATING"}]
+
+Where:
+
+- ID: The integer id attribute of the <job-description> being rated
+- RATING: Must be one of: "EXCELLENT", "GOOD", "FAIR", or "POOR"
+- EXCELLENT: It's a perfect job
+- GOOD: This job is just OK
+- FAIR: This job doesn't look good
+- POOR: This job is complete shit
+
+IMPORTANT: Your response should be ONLY the JSON array without any code fences, explanations, or other text."""
+    use_history: bool = False
+
+    @staticmethod
+    def request_params() -> "RequestParams":
+        return request_params(
             maxTokens = 8192,
             temperature = 0.4,
             use_history = False
         )
 
+    @staticmethod
+    def prompt(candidate: str, job_descriptions: list[str]) -> str:
+        today = str(date.today())
+        jobs = "\n\n".join(f"<job-description id=\"{i}\">\n{job}\n</job-description>" for i, job in enumerate(job_descriptions))
+        return f"""{candidate}
+
+{jobs}
+
+今天是{today}，请逐个评判以上{len(job_descriptions)}个岗位是否对求职者来说是一份优质工作。"""
+
+
+class Screener(BaseModel):
+    name: str = "screen"
+    instruction: str = Evaluator().instruction.removesuffix("请针对每项标准提供评级 (EXCELLENT, GOOD, FAIR, or POOR)。") + """请快速综合以上标准给出总体评级，并给出你对该评级的把握程度。
+
+Your response MUST be valid JSON matching this exact format (no other text, markdown, or explanation):
+
+{"rating":"RATING","confidence":CONFIDENCE}
+
+Where:
+
+- RATING: Must be one of: "EXCELLENT", "GOOD", "FAIR", or "POOR"
+- EXCELLENT: It's a perfect job
+- GOOD: This job is just OK
+- FAIR: This job doesn't look good
+- POOR: This job is complete shit
+- CONFIDENCE: A number between 0 and 1 indicating how certain you are about the rating
+
+IMPORTANT: Your response should be ONLY the JSON object without any code fences, explanations, or other text."""
+    use_history: bool = False
+
+    @staticmethod
+    def request_params() -> "RequestParams":
+        return request_params(
+            maxTokens = 256,
+            temperature = 0.2,
+            use_history = False
+        )
+
+
+class Rating(BaseModel):
+    rating: Literal["EXCELLENT", "GOOD", "FAIR", "POOR"]
 
-def spawn_workflow() -> Callable[[str, str], Awaitable[str]]:
-    fast = FastAgent("job-eval", parse_cli_args=False)
 
-    @fast.agent(**Evaluator().model_dump(), request_params=Evaluator.request_params())
-    @fast.agent(**EvalSummary().model_dump(), request_params=EvalSummary.request_params())
-    async def workflow(resume: str, job_description: str) -> str:
-        async with fast.run() as agent:
-            evaluation = await agent.eval(Evaluator.prompt(resume, job_description))
-            return remove_json_fences(await agent.eval_summary(evaluation))
+class ScreenResult(BaseModel):
+    rating: Literal["EXCELLENT", "GOOD", "FAIR", "POOR"]
+    confidence: float = Field(ge=0, le=1)
+
+
+class CascadeOptions(BaseModel):
+    screen_model: str | None = None
+    strong_model: str | None = "google.gemini-2.5-flash"
+    escalate: set[str] = {"GOOD", "FAIR"}
+    min_confidence: float = 0.7
+
+
+class CascadeStats(BaseModel):
+    screened: int = 0
+    settled: int = 0
+    escalated: int = 0
+    invalid: int = 0
+
+    def report(self) -> str:
+        share = self.settled / self.screened if self.screened else 0.0
+        return f"分级评判: 初筛 {self.screened}个岗位, 初筛定级 {self.settled}个 ({share:.0%}), 升级复评 {self.escalated}个 (其中初筛结果无效 {self.invalid}个)"
+
+
+class BatchRating(BaseModel):
+    id: int
+    rating: Literal["EXCELLENT", "GOOD", "FAIR", "POOR"]
+
+
+class BatchStats(BaseModel):
+    jobs: int = 0
+    requests: int = 0
+    retries: int = 0
+    input_tokens: int = 0
+    baseline_requests: int = 0
+    baseline_input_tokens: int = 0
+    seconds: float = 0.0
+
+    def report(self) -> str:
+        saved = 1 - self.input_tokens / self.baseline_input_tokens if self.baseline_input_tokens else 0.0
+        rate = self.jobs / self.seconds if self.seconds else 0.0
+        return (
+            f"批量评判: {self.jobs}个岗位, {self.requests}次请求 (逐个评判: {self.baseline_requests}次), "
+            f"{self.retries}个岗位单独重试, 估算输入 {self.input_tokens} tokens (逐个评判: {self.baseline_input_tokens} tokens, 节省 {saved:.0%}), "
+            f"{rate:.2f}个岗位/秒"
+        )
+
+
+def context_window(model: str, default: int = 32768) -> int:
+    from mcp_agent.llm.model_database import ModelDatabase
+    return ModelDatabase.get_context_window(model.split(".", 1)[-1]) or default
+
+
+def cache_key(candidate: str, job_description: str, model: str | None = None) -> str:
+    return LLMCache.key(
+        "job-eval",
+        candidate,
+        job_description,
+        Evaluator().instruction,
+        EvalSummary().instruction,
+        model_name(model),
+        Evaluator.request_params().temperature,
+        EvalSummary.request_params().temperature,
+    )
+
+
+def screen_cache_key(candidate: str, job_description: str, model: str | None = None) -> str:
+    return LLMCache.key(
+        "job-eval-screen",
+        candidate,
+        job_description,
+        Screener().instruction,
+        model_name(model),
+        Screener.request_params().temperature,
+    )
+
+
+def batch_cache_key(candidate: str, job_description: str) -> str:
+    return LLMCache.key(
+        "job-eval-batch",
+        candidate,
+        job_description,
+        BatchEvaluator().instruction,
+        model_name(),
+        BatchEvaluator.request_params().temperature,
+    )
+
+
+class JobEvaluator:
+    _cache: LLMCache | None
+    _context_tokens: int | None
+    _cascade: CascadeOptions | None
+    stats: BatchStats
+    cascade_stats: CascadeStats
+
+    def __init__(self, cache: LLMCache | None = None, context_tokens: int | None = None, cascade: CascadeOptions | None = None):
+        self._cache = cache
+        self._context_tokens = context_tokens
+        self._cascade = cascade
+        self._model = cascade.strong_model if cascade else None
+        self.stats = BatchStats()
+        self.cascade_stats = CascadeStats()
+
+    async def __aenter__(self) -> "JobEvaluator":
+        from mcp_agent.core.fastagent import FastAgent
+        fast = FastAgent("job-eval", parse_cli_args=False)
+        screen_model = self._cascade.screen_model if self._cascade else None
+
+        @fast.agent(**Evaluator().model_dump(), model=self._model, request_params=Evaluator.request_params())
+        @fast.agent(**EvalSummary().model_dump(), model=self._model, request_params=EvalSummary.request_params())
+        @fast.agent(**BatchEvaluator().model_dump(), request_params=BatchEvaluator.request_params())
+        @fast.agent(**Screener().model_dump(), model=screen_model, request_params=Screener.request_params())
+        async def agents() -> None:
+            pass
+
+        self._stack = AsyncExitStack()
+        self._agent = await self._stack.enter_async_context(fast.run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._stack.aclose()
+
+    async def screen(self, candidate: str, job_description: str) -> ScreenResult | None:
+        model = model_name(self._cascade.screen_model)
+        key = screen_cache_key(candidate, job_description, model) if self._cache else None
+        if key and (raw := self._cache.get(key)) is not None:
+            count("llm.cache_hit")
+        else:
+            prompt = Evaluator.prompt(candidate, job_description)
+            try:
+                with llm(self._agent.screen, "screen", model):
+                    raw = remove_json_fences(await limiter.ask(model, self._agent.screen, prompt, estimate_tokens(Screener().instruction + prompt), parse_screen))
+            except ValueError:
+                return None
+        try:
+            result = ScreenResult.model_validate_json(raw)
+        except ValidationError:
+            return None
+        if key:
+            self._cache.put(key, raw)
+        return result
+
+    async def evaluate(self, candidate: str, job_description: str) -> str:
+        if self._cascade:
+            self.cascade_stats.screened += 1
+            screen = await self.screen(candidate, job_description)
+            if screen is None:
+                self.cascade_stats.invalid += 1
+            elif screen.rating not in self._cascade.escalate and screen.confidence >= self._cascade.min_confidence:
+                self.cascade_stats.settled += 1
+                count("cascade.settled")
+                return json.dumps({"rating": screen.rating})
+            self.cascade_stats.escalated += 1
+            count("cascade.escalated")
+        model = model_name(self._model)
+        key = cache_key(candidate, job_description, model) if self._cache else None
+        if key and (result := self._cache.get(key)) is not None:
+            count("llm.cache_hit")
+            return result
+        prompt = Evaluator.prompt(candidate, job_description)
+        with llm(self._agent.eval, "eval", model):
+            evaluation = await limiter.ask(model, self._agent.eval, prompt, estimate_tokens(Evaluator().instruction + prompt))
+        with llm(self._agent.eval_summary, "eval_summary", model):
+            result = remove_json_fences(await limiter.ask(model, self._agent.eval_summary, evaluation, estimate_tokens(EvalSummary().instruction + evaluation), parse_rating))
+        if key:
+            self._cache.put(key, result)
+        return result
+
+    def _packs(self, candidate: str, job_descriptions: list[str], batch_size: int) -> list[list[int]]:
+        budget = (self._context_tokens or context_window(model_name())) - BatchEvaluator.request_params().maxTokens
+        budget -= estimate_tokens(BatchEvaluator().instruction) + estimate_tokens(BatchEvaluator.prompt(candidate, []))
+        packs = []
+        used = 0
+        for i, job in enumerate(job_descriptions):
+            tokens = estimate_tokens(job) + 16
+            if packs and len(packs[-1]) < batch_size and used + tokens <= budget:
+                packs[-1].append(i)
+                used += tokens
+            else:
+                packs.append([i])
+                used = tokens
+        return packs
+
+    async def evaluate_batch(self, candidate: str, job_descriptions: list[str], batch_size: int = 8) -> list[str | None]:
+        start = time.perf_counter()
+        results = [None] * len(job_descriptions)
+        keys = [batch_cache_key(candidate, job) if self._cache else None for job in job_descriptions]
+        todo = []
+        for i, key in enumerate(keys):
+            if key and (result := self._cache.get(key)) is not None:
+                count("llm.cache_hit")
+                results[i] = result
+            else:
+                todo.append(i)
+        for pack in self._packs(candidate, [job_descriptions[i] for i in todo], batch_size):
+            ids = [todo[i] for i in pack]
+            prompt = BatchEvaluator.prompt(candidate, [job_descriptions[i] for i in ids])
+            self.stats.requests += 1
+            tokens = estimate_tokens(BatchEvaluator().instruction) + estimate_tokens(prompt)
+            self.stats.input_tokens += tokens
+            try:
+                with llm(self._agent.batch_eval, "batch_eval", model_name()):
+                    response = await limiter.ask(model_name(), self._agent.batch_eval, prompt, tokens, batch_entries)
+            except ValueError:
+                response = ""
+            for entry in parse_batch(response, len(ids)):
+                i = ids[entry.id]
+                results[i] = json.dumps({"rating": entry.rating})
+                if keys[i]:
+                    self._cache.put(keys[i], results[i])
+        for i in todo:
+            self.stats.jobs += 1
+            self.stats.baseline_requests += 2
+            self.stats.baseline_input_tokens += estimate_tokens(Evaluator().instruction + Evaluator.prompt(candidate, job_descriptions[i]) + EvalSummary().instruction)
+            if results[i] is None:
+                self.stats.retries += 1
+                self.stats.requests += 2
+                self.stats.input_tokens += estimate_tokens(Evaluator().instruction + Evaluator.prompt(candidate, job_descriptions[i]) + EvalSummary().instruction)
+                try:
+                    results[i] = await self.evaluate(candidate, job_descriptions[i])
+                except Exception as e:
+                    # The rest of the batch is already rated; only this job is reported as failed.
+                    print(f"评判失败，跳过岗位: {e!r}", file=sys.stderr)
+                    count("eval.failed")
+        self.stats.seconds += time.perf_counter() - start
+        return results
+
+
+def parse_rating(raw: str) -> Rating:
+    return Rating.model_validate_json(remove_json_fences(raw))
+
+
+def parse_screen(raw: str) -> ScreenResult:
+    return ScreenResult.model_validate_json(remove_json_fences(raw))
+
+
+def batch_entries(raw: str) -> list:
+    entries = json.loads(remove_json_fences(raw))
+    if not isinstance(entries, list):
+        raise ValueError("expected a JSON array")
+    return entries
+
+
+def parse_batch(raw: str, n: int) -> list[BatchRating]:
+    try:
+        entries = batch_entries(raw)
+    except ValueError:
+        return []
+    ratings = {}
+    for entry in entries:
+        try:
+            rating = BatchRating.model_validate(entry)
+        except ValidationError:
+            continue
+        if 0 <= rating.id < n:
+            ratings.setdefault(rating.id, rating)
+    return list(ratings.values())
+
+
+def spawn_workflow(cache: LLMCache | None = None, cascade: CascadeOptions | None = None) -> Callable[[str, str], Awaitable[str]]:
+    async def workflow(candidate: str, job_description: str) -> str:
+        async with JobEvaluator(cache, cascade=cascade) as evaluator:
+            return await evaluator.evaluate(candidate, job_description)
 
     return workflow
 
 
-if __name__ == "__main__":
-    import sys
-    import asyncio
-    import argparse
+def add_cascade_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--cascade", help="启用分级评判: 先由低成本模型初筛，仅将模棱两可的岗位交由更强的模型完整评判", action="store_true")
+    cliparser.add_argument("--screen_model", help="初筛使用的模型 (默认: 配置文件中的default_model)", type=str)
+    cliparser.add_argument("--strong_model", help="完整评判使用的模型 (默认: google.gemini-2.5-flash)", type=str, default="google.gemini-2.5-flash")
+    cliparser.add_argument("--escalate", help="需要升级复评的初筛评级 (默认: GOOD,FAIR)", type=str, default="GOOD,FAIR")
+    cliparser.add_argument("--min_confidence", help="初筛把握程度低于该值时升级复评 (0~1，默认: 0.7)", type=float, default=0.7)
+
+
+def cascade_options(args: argparse.Namespace) -> CascadeOptions | None:
+    if not args.cascade:
+        return None
+    return CascadeOptions(
+        screen_model = args.screen_model,
+        strong_model = args.strong_model,
+        escalate = set(r.strip() for r in args.escalate.split(",") if r.strip()),
+        min_confidence = args.min_confidence,
+    )
+
+
+description = "评判岗位是否为优质工作。"
 
-    cliparser = argparse.ArgumentParser(description="评判岗位是否为优质工作。")
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
     cliparser.add_argument("--resume", help="简历文件路径 (目前只支持文本文件，推荐使用Markdown)", type=str, required=True)
-    args, _ = cliparser.parse_known_args()
+    add_profile_args(cliparser)
+    add_cascade_args(cliparser)
+    add_cache_args(cliparser)
+    add_ratelimit_args(cliparser)
+
 
-    async def main() -> None:
-        with open(args.resume, "r") as f:
-            resume = f.read()
-        job_description = sys.stdin.read()
-        workflow = spawn_workflow()
-        await workflow(resume, job_description)
+async def main(args: argparse.Namespace) -> None:
+    configure_limits(args)
+    with open(args.resume, "r") as f:
+        resume = f.read()
+    job_description = sys.stdin.read()
+    candidate = await describe_candidate(resume, args.full_resume, args.profiles)
+    workflow = spawn_workflow(open_cache(args), cascade_options(args))
+    print(await workflow(candidate, job_description))
 
-    asyncio.run(main())
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
@@ -0,0 +1,214 @@
+import re
+import hashlib
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+from typing import Iterable
+from pydantic import BaseModel
+from salary import SalaryFloor, parse_salary
+from rank import tokenize
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class StoredJob(BaseModel):
+    url: str
+    company: str
+    title: str
+    salary: str
+    desc: str
+    desc_hash: str
+    first_seen: str
+    last_seen: str
+    rating: str | None = None
+    evaluation: str | None = None
+
+
+def bigrams(*texts: str) -> str:
+    return " ".join(token for text in texts for token in tokenize(text) if token[0] >= "一")
+
+
+def _like(term: str) -> str:
+    return "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+
+
+class JobStore:
+    _conn: sqlite3.Connection
+
+    def __init__(self, path: str = "jobs.db"):
+        self._conn = sqlite3.connect(Path(path).resolve())
+        self._conn.row_factory = sqlite3.Row
+        indexed = self._conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name IN ('jobs_fts', 'jobs_bigram')").fetchone()[0] == 2
+        self._conn.executescript("""
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS jobs (
+    url TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    title TEXT NOT NULL,
+    salary TEXT NOT NULL,
+    desc TEXT NOT NULL,
+    desc_hash TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    rating TEXT,
+    evaluation TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_last_seen ON jobs (last_seen);
+CREATE TABLE IF NOT EXISTS rejected (
+    url TEXT PRIMARY KEY,
+    last_seen TEXT NOT NULL
+);
+-- Trigram tokens need no word segmentation, so Chinese and mixed-language text match by substring.
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+    title, company, desc,
+    content = 'jobs', content_rowid = 'rowid', tokenize = 'trigram'
+);
+CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+    INSERT INTO jobs_fts (rowid, title, company, desc) VALUES (new.rowid, new.title, new.company, new.desc);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, desc) VALUES ('delete', old.rowid, old.title, old.company, old.desc);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF title, company, desc ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, company, desc) VALUES ('delete', old.rowid, old.title, old.company, old.desc);
+    INSERT INTO jobs_fts (rowid, title, company, desc) VALUES (new.rowid, new.title, new.company, new.desc);
+END;
+-- Trigrams cannot index two-character words, which most Chinese keywords are; they match CJK bigrams here instead.
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_bigram USING fts5(
+    bigrams,
+    content = '', detail = 'none', tokenize = 'unicode61'
+);
+""")
+        if not indexed:
+            self.rebuild_index()
+
+    def __enter__(self) -> "JobStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, url: str) -> StoredJob | None:
+        row = self._conn.execute("SELECT * FROM jobs WHERE url = ?", (url,)).fetchone()
+        return StoredJob.model_validate(dict(row)) if row else None
+
+    def known(self, url: str | None, title: str | None = None, salary: str | None = None, require_rating: bool = False) -> bool:
+        if not url:
+            return False
+        row = self._conn.execute("SELECT title, salary, rating FROM jobs WHERE url = ?", (url,)).fetchone()
+        if row is None or (require_rating and row["rating"] is None):
+            return False
+        return (title is None or row["title"] == title) and (salary is None or row["salary"] == salary)
+
+    def rejected(self, url: str | None) -> bool:
+        if not url:
+            return False
+        return self._conn.execute("SELECT 1 FROM rejected WHERE url = ?", (url,)).fetchone() is not None
+
+    def reject(self, url: str | None) -> None:
+        if not url:
+            return
+        with self._conn:
+            self._conn.execute("INSERT INTO rejected (url, last_seen) VALUES (?, ?) ON CONFLICT (url) DO UPDATE SET last_seen = excluded.last_seen", (url, _now()))
+
+    def touch(self, url: str) -> None:
+        with self._conn:
+            self._conn.execute("UPDATE jobs SET last_seen = ? WHERE url = ?", (_now(), url))
+
+    def _upsert(self, job: dict[str, str], seen: str) -> bool:
+        desc_hash = content_hash(job["desc"])
+        row = self._conn.execute("SELECT rowid, title, company, desc_hash FROM jobs WHERE url = ?", (job["url"],)).fetchone()
+        if row is None:
+            rowid = self._conn.execute(
+                "INSERT INTO jobs (url, company, title, salary, desc, desc_hash, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["url"], job["company"], job["title"], job["salary"], job["desc"], desc_hash, seen, seen)
+            ).lastrowid
+            self._conn.execute("INSERT INTO jobs_bigram (rowid, bigrams) VALUES (?, ?)", (rowid, bigrams(job["title"], job["company"], job["desc"])))
+            return True
+        changed = row["desc_hash"] != desc_hash
+        if changed or row["title"] != job["title"] or row["company"] != job["company"]:
+            # The bigram index stores no content, so deleting an entry needs the tokens it was built from.
+            desc = self._conn.execute("SELECT desc FROM jobs WHERE rowid = ?", (row["rowid"],)).fetchone()["desc"]
+            self._conn.execute("INSERT INTO jobs_bigram (jobs_bigram, rowid, bigrams) VALUES ('delete', ?, ?)", (row["rowid"], bigrams(row["title"], row["company"], desc)))
+            self._conn.execute("INSERT INTO jobs_bigram (rowid, bigrams) VALUES (?, ?)", (row["rowid"], bigrams(job["title"], job["company"], job["desc"])))
+        self._conn.execute(
+            f"UPDATE jobs SET company = ?, title = ?, salary = ?, desc = ?, desc_hash = ?, first_seen = MIN(first_seen, ?), last_seen = MAX(last_seen, ?){', rating = NULL, evaluation = NULL' if changed else ''} WHERE url = ?",
+            (job["company"], job["title"], job["salary"], job["desc"], desc_hash, seen, seen, job["url"])
+        )
+        return changed
+
+    def upsert(self, info: BaseModel) -> bool:
+        with self._conn:
+            return self._upsert(info.model_dump(), _now())
+
+    def ingest(self, jobs: Iterable[dict[str, str]], seen: str | None = None) -> tuple[int, int]:
+        seen = seen or _now()
+        total = changed = 0
+        with self._conn:
+            for job in jobs:
+                total += 1
+                changed += self._upsert(job, seen)
+        return total, changed
+
+    def rebuild_index(self) -> None:
+        with self._conn:
+            self._conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+            self._conn.execute("INSERT INTO jobs_bigram (jobs_bigram) VALUES ('delete-all')")
+            self._conn.executemany(
+                "INSERT INTO jobs_bigram (rowid, bigrams) VALUES (?, ?)",
+                ((row["rowid"], bigrams(row["title"], row["company"], row["desc"])) for row in self._conn.execute("SELECT rowid, title, company, desc FROM jobs"))
+            )
+
+    def search(self, text: str = "", company: str | None = None, since: str | None = None, ratings: set[str] | None = None, salary_floor: SalaryFloor | None = None, limit: int | None = None) -> list[StoredJob]:
+        terms = text.split()
+        phrases = ['"' + term.replace('"', '""') + '"' for term in terms if len(term) >= 3]
+        pairs = ['"' + term + '"' for term in terms if len(term) == 2 and bigrams(term) == term]
+        sql = "SELECT jobs.* FROM jobs"
+        where = []
+        params = []
+        # Unary + keeps the planner walking jobs_last_seen and testing membership in the matched rowids,
+        # instead of loading every match (description included) just to sort by last_seen.
+        if phrases:
+            where.append("+jobs.rowid IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)")
+            params.append(" AND ".join(phrases))
+        if pairs:
+            where.append("+jobs.rowid IN (SELECT rowid FROM jobs_bigram WHERE jobs_bigram MATCH ?)")
+            params.append(" AND ".join(pairs))
+        # Single characters and two-character non-Chinese terms have no index, so those fall back to a scan.
+        for term in terms:
+            if len(term) < 3 and '"' + term + '"' not in pairs:
+                where.append("(jobs.title LIKE ? ESCAPE '\\' OR jobs.company LIKE ? ESCAPE '\\' OR jobs.desc LIKE ? ESCAPE '\\')")
+                params.extend([_like(term)] * 3)
+        if company:
+            where.append("jobs.company LIKE ? ESCAPE '\\'")
+            params.append(_like(company))
+        if since:
+            where.append("jobs.last_seen >= ?")
+            params.append(since)
+        if ratings:
+            where.append(f"jobs.rating IN ({', '.join('?' * len(ratings))})")
+            params.extend(sorted(ratings))
+        if salary_floor:
+            self._conn.create_function("salary_accepted", 1, lambda salary: salary_floor.accepts(parse_salary(salary)), deterministic=True)
+            where.append("salary_accepted(jobs.salary)")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY jobs.last_seen DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [StoredJob.model_validate(dict(row)) for row in self._conn.execute(sql, params)]
+
+    def set_evaluation(self, url: str, rating: str, evaluation: str | None = None) -> None:
+        with self._conn:
+            self._conn.execute("UPDATE jobs SET rating = ?, evaluation = ? WHERE url = ?", (rating, evaluation, url))
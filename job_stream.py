@@ -0,0 +1,104 @@
+import json
+import asyncio
+from pathlib import Path
+from typing import AsyncGenerator, TextIO
+
+
+def checkpoint_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.name}.ckpt")
+
+
+class JobStream:
+    _path: Path
+    _checkpoint: Path
+    _jobs: dict[str, dict] | None
+    _output: TextIO | None
+    _marks: TextIO | None
+    processed: set[str]
+
+    def __init__(self, path: str, restart: bool = False):
+        self._path = Path(path)
+        self._checkpoint = checkpoint_path(path)
+        self._jobs = {} if self._path.suffix == ".json" else None
+        self._output = None
+        self._marks = None
+        self.processed = set()
+        self._restart = restart
+
+    @property
+    def streaming(self) -> bool:
+        return self._jobs is None
+
+    def __enter__(self) -> "JobStream":
+        if not self.streaming:
+            return self
+        resume = self._checkpoint.exists() and not self._restart
+        if resume:
+            with open(self._checkpoint, "r", encoding="utf-8") as f:
+                self.processed.update(line.strip() for line in f if line.strip())
+        else:
+            # Drop the previous run's output before the checkpoint appears, so a follower never reads it.
+            self._path.unlink(missing_ok=True)
+        self._marks = open(self._checkpoint, "a" if resume else "w", encoding="utf-8")
+        self._output = open(self._path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if not self.streaming:
+            if exc_type is None and self._jobs:
+                with open(self._path, "w", encoding="utf-8") as f:
+                    json.dump(list(self._jobs.values()), f, ensure_ascii=False, indent=4)
+            return
+        self._output.close()
+        self._marks.close()
+        if exc_type is None:
+            self._checkpoint.unlink()
+
+    def write(self, job: dict[str, str]) -> None:
+        if not self.streaming:
+            self._jobs.setdefault(job["url"], job)
+            return
+        if job["url"] in self.processed:
+            return
+        self._output.write(json.dumps(job, ensure_ascii=False) + "\n")
+        self._output.flush()
+
+    def mark(self, url: str) -> None:
+        if not self.streaming or url in self.processed:
+            return
+        self.processed.add(url)
+        self._marks.write(url + "\n")
+        self._marks.flush()
+
+
+async def read_jobs(path: str, follow: bool = False, interval: float = 1.0) -> AsyncGenerator[dict[str, str], None]:
+    path = Path(path)
+    checkpoint = checkpoint_path(path)
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            for job in json.load(f):
+                yield job
+        return
+    # An output without a checkpoint may be left over from a finished run, so wait for the writer to start.
+    while follow and not (checkpoint.exists() and path.exists()):
+        await asyncio.sleep(interval)
+    seen = set()
+    buffer = ""
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            # Sample the checkpoint before reading, so lines flushed just before it is removed are not missed.
+            finished = not (follow and checkpoint.exists())
+            line = f.readline()
+            if line.endswith("\n") or (line and finished):
+                line, buffer = buffer + line, ""
+                if line.strip():
+                    job = json.loads(line)
+                    if job["url"] not in seen:
+                        seen.add(job["url"])
+                        yield job
+                continue
+            buffer += line
+            if finished:
+                break
+            await asyncio.sleep(interval)
@@ -1,9 +1,50 @@
-import json
+import sys
+import time
+import asyncio
+import argparse
 from pydantic import BaseModel
-from typing import Callable, Awaitable
-from mcp_agent.core.fastagent import FastAgent
-from mcp_agent.core.request_params import RequestParams
-from utils import remove_json_fences
+from typing import TYPE_CHECKING, Callable, Awaitable, Literal
+from llm_cache import LLMCache, add_cache_args, open_cache
+from resume import add_profile_args, describe_candidate
+from utils import remove_json_fences, model_name, estimate_tokens, request_params
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from tracing import llm, count
+
+if TYPE_CHECKING:
+    from mcp_agent.core.request_params import RequestParams
+
+
+verdict_format = """Your response MUST be valid JSON matching this exact format (no other text, markdown, or explanation):
+
+{
+  "rating": "RATING",
+  "feedback": "DETAILED FEEDBACK",
+  "needs_improvement": BOOLEAN,
+  "focus_areas": ["FOCUS_AREA_1", "FOCUS_AREA_2", "FOCUS_AREA_3"]
+}
+
+Where:
+
+- RATING: Must be one of: "EXCELLENT", "GOOD", "FAIR", or "POOR"
+- EXCELLENT: No improvements needed
+- GOOD: Only minor improvements possible
+- FAIR: Several improvements needed
+- POOR: Major improvements needed
+- DETAILED FEEDBACK: Specific, actionable feedback (as a single string)
+- BOOLEAN: true or false (lowercase, no quotes) indicating if further improvement is needed
+- FOCUS_AREAS: Array of 1-3 specific areas to focus on (empty array if no improvement needed)
+
+Example of valid response (DO NOT include the triple backticks in your response):
+
+{
+  "rating": "GOOD",
+  "feedback": "The response is clear but could use more supporting evidence.",
+  "needs_improvement": true,
+  "focus_areas": ["Add more examples", "Include data points"]
+}
+
+IMPORTANT: Your response should be ONLY the JSON object without any code fences, explanations, or other text."""
+ratings = ["POOR", "FAIR", "GOOD", "EXCELLENT"]
 
 
 class Writer(BaseModel):
@@ -11,7 +52,7 @@ class Writer(BaseModel):
     model: str = "google.gemini-2.5-flash"
     instruction: str
 
-    def __init__(self, resume: str, job_description: str) -> None:
+    def __init__(self, candidate: str) -> None:
         super().__init__(instruction=f"""你是一位专注于求职信写作的职业导师，你的任务是根求职者简历代入求职者的角色针对给定职位发布撰写一段用于“BOSS直聘”、“脉脉”等求职平台初次沟通的文案。
 
 注意事项:
@@ -21,34 +62,29 @@ class Writer(BaseModel):
 3. 如“BOSS直聘”、“脉脉”等这类求职平台均为实名注册，不需要自报姓名；
 4. 请仅回复文案正文，不要添加任何描述、解释或其他内容。
 
-<bio-resume>
-{resume}
-</bio-resume>
-
-<job-description>
-{job_description}
-</job-description>""")
+{candidate}""")
 
     @staticmethod
-    def request_params() -> RequestParams:
-        return RequestParams(maxTokens=8192, temperature=0.7)
+    def request_params() -> "RequestParams":
+        return request_params(maxTokens=8192, temperature=0.7)
 
     @staticmethod
-    def prompt() -> str:
-        return "请撰写初稿。"
+    def prompt(job_description: str) -> str:
+        return f"""<job-description>
+{job_description}
+</job-description>
+
+请撰写初稿。"""
 
     @staticmethod
-    def refine(eval_summary: str, eval_content: str, version: int) -> str | None:
-        res = json.loads(remove_json_fences(eval_summary))
-        if not res["needs_improvement"]:
+    def refine(verdict: "Verdict", eval_content: str | None, version: int) -> str | None:
+        if not verdict.needs_improvement:
             return None
+        details = f"\n<details>\n{eval_content}\n</details>" if eval_content else ""
         return f"""<expert-feedbacks>
-<rating>{res["rating"]}</rating>
-<feedback>{res["feedback"]}</feedback>
-<focus-areas>{",".join(res["focus_areas"])}</focus-areas>
-<details>
-{eval_content}
-</details>
+<rating>{verdict.rating}</rating>
+<feedback>{verdict.feedback}</feedback>
+<focus-areas>{",".join(verdict.focus_areas)}</focus-areas>{details}
 </expert-feedbacks>
 
 请根据专家反馈对文案内容作出第{version + 1}次修改:
@@ -65,7 +101,15 @@ class Evaluator(BaseModel):
     name: str = "eval"
     instruction: str
 
-    def __init__(self, resume: str, job_description: str) -> None:
+    def __init__(self, candidate: str, structured: bool = False) -> None:
+        verdict = f"""
+
+Respond with the evaluation as a structured response with:
+
+- Overall quality rating.
+- Specific feedback and areas for improvement (in Chinese).
+
+{verdict_format}""" if structured else ""
         super().__init__(instruction=f"""你是一位专注于求职信评审的职业导师，请根据以下标准对文案内容作出评价:
 
 1. 清晰度：语言是否清晰、简洁且语法正确？
@@ -82,22 +126,17 @@ class Evaluator(BaseModel):
 - 提供评级 (EXCELLENT, GOOD, FAIR, or POOR)。
 - 提供具体的反馈或改进建议。
 
-<bio-resume>
-{resume}
-</bio-resume>
-
-<job-description>
-{job_description}
-</job-description>""")
+{candidate}{verdict}""")
 
     @staticmethod
-    def request_params() -> RequestParams:
-        return RequestParams(maxTokens=8192, temperature=0.4)
+    def request_params() -> "RequestParams":
+        return request_params(maxTokens=8192, temperature=0.4)
 
     @staticmethod
-    def prompt(letter: str, version: int) -> str:
+    def prompt(letter: str, version: int, job_description: str | None = None) -> str:
         version_prompt = "初稿" if version == 0 else f"第{version}次修订稿"
-        return f"""<content version="{version_prompt}">
+        job = f"<job-description>\n{job_description}\n</job-description>\n\n" if job_description else ""
+        return f"""{job}<content version="{version_prompt}">
 {letter}
 </content>
 
@@ -111,84 +150,165 @@ class EvalSummary(BaseModel):
 - Overall quality rating.
 - Specific feedback and areas for improvement (in Chinese).
 
-Your response MUST be valid JSON matching this exact format (no other text, markdown, or explanation):
-
-{
-  "rating": "RATING",
-  "feedback": "DETAILED FEEDBACK",
-  "needs_improvement": BOOLEAN,
-  "focus_areas": ["FOCUS_AREA_1", "FOCUS_AREA_2", "FOCUS_AREA_3"]
-}
-
-Where:
-
-- RATING: Must be one of: "EXCELLENT", "GOOD", "FAIR", or "POOR"
-- EXCELLENT: No improvements needed
-- GOOD: Only minor improvements possible
-- FAIR: Several improvements needed
-- POOR: Major improvements needed
-- DETAILED FEEDBACK: Specific, actionable feedback (as a single string)
-- BOOLEAN: true or false (lowercase, no quotes) indicating if further improvement is needed
-- FOCUS_AREAS: Array of 1-3 specific areas to focus on (empty array if no improvement needed)
-
-Example of valid response (DO NOT include the triple backticks in your response):
-
-{
-  "rating": "GOOD",
-  "feedback": "The response is clear but could use more supporting evidence.",
-  "needs_improvement": true,
-  "focus_areas": ["Add more examples", "Include data points"]
-}
-
-IMPORTANT: Your response should be ONLY the JSON object without any code fences, explanations, or other text."""
+""" + verdict_format
     use_history: bool = False
 
     @staticmethod
-    def request_params() -> RequestParams:
-        return RequestParams(
+    def request_params() -> "RequestParams":
+        return request_params(
             maxTokens = 8192,
             temperature = 0.4,
             use_history = False
         )
 
 
-def spawn_workflow(resume: str, job_description: str) -> Callable[[int], Awaitable[str]]:
+class Verdict(BaseModel):
+    rating: Literal["EXCELLENT", "GOOD", "FAIR", "POOR"]
+    feedback: str = ""
+    needs_improvement: bool
+    focus_areas: list[str] = []
+
+
+def parse_verdict(raw: str) -> Verdict:
+    return Verdict.model_validate_json(remove_json_fences(raw))
+
+
+class RefineOptions(BaseModel):
+    merged: bool = False
+    stop_at: Literal["EXCELLENT", "GOOD", "FAIR", "POOR"] | None = None
+    max_tokens: int | None = None
+    max_seconds: float | None = None
+
+
+class LetterStats(BaseModel):
+    rounds: int = 0
+    calls: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+    rating: str | None = None
+
+    def report(self) -> str:
+        return f"修改轮数: {self.rounds}, 模型调用: {self.calls}次, tokens: {self.tokens}, 耗时: {self.seconds:.1f}秒, 评级: {self.rating or '-'}"
+
+
+def cache_key(candidate: str, job_description: str, n: int, options: RefineOptions) -> str:
+    writer = Writer(candidate)
+    return LLMCache.key(
+        "job-writer",
+        n,
+        options.model_dump(),
+        writer.instruction,
+        Evaluator(candidate, options.merged).instruction,
+        EvalSummary().instruction,
+        Writer.prompt(job_description),
+        model_name(writer.model),
+        model_name(),
+        Writer.request_params().temperature,
+        Evaluator.request_params().temperature,
+        EvalSummary.request_params().temperature,
+    )
+
+
+def spawn_workflow(candidate: str, job_description: str, cache: LLMCache | None = None, options: RefineOptions = RefineOptions()) -> Callable[[int, LetterStats | None], Awaitable[str]]:
+    from mcp_agent.core.fastagent import FastAgent
     fast = FastAgent("job-writer", parse_cli_args=False)
+    writer = Writer(candidate)
+    models = dict(writer=model_name(writer.model), eval=model_name(), eval_summary=model_name())
 
-    @fast.agent(**Writer(resume, job_description).model_dump(), request_params=Writer.request_params())
-    @fast.agent(**Evaluator(resume, job_description).model_dump(), request_params=Evaluator.request_params())
+    @fast.agent(**writer.model_dump(), request_params=Writer.request_params())
+    @fast.agent(**Evaluator(candidate, options.merged).model_dump(), request_params=Evaluator.request_params())
     @fast.agent(**EvalSummary().model_dump(), request_params=EvalSummary.request_params())
-    async def workflow(n: int) -> str:
+    async def workflow(n: int, stats: LetterStats | None = None) -> str:
+        stats = stats if stats is not None else LetterStats()
+        start = time.perf_counter()
+        key = cache_key(candidate, job_description, n, options) if cache else None
+        if key and (letter := cache.get(key)) is not None:
+            count("llm.cache_hit")
+            return letter
         async with fast.run() as agent:
-            letter = await agent.writer(Writer.prompt())
+
+            async def call(name: str, prompt: str, parse: Callable[[str], BaseModel] | None = None) -> str:
+                tokens = estimate_tokens(agent[name].instruction + prompt)
+                with llm(agent[name], name, models[name]):
+                    response = await limiter.ask(models[name], agent[name].send, prompt, tokens, parse)
+                stats.calls += 1
+                accumulators = (agent[name].usage_accumulator for name in ("writer", "eval", "eval_summary"))
+                stats.tokens = sum(acc.cumulative_billing_tokens for acc in accumulators if acc)
+                return response
+
+            def exhausted() -> bool:
+                if options.max_tokens is not None and stats.tokens >= options.max_tokens:
+                    return True
+                return options.max_seconds is not None and time.perf_counter() - start >= options.max_seconds
+
+            letter = await call("writer", Writer.prompt(job_description))
             for i in range(n):
-                evaluation = await agent.eval(Evaluator.prompt(letter, i))
-                prompt = Writer.refine(await agent.eval_summary(evaluation), evaluation, i)
-                if prompt is None:
+                if exhausted():
                     break
-                letter = await agent.writer(prompt)
+                try:
+                    evaluation = await call("eval", Evaluator.prompt(letter, i, job_description if i == 0 else None), parse_verdict if options.merged else None)
+                    summary = evaluation if options.merged else await call("eval_summary", evaluation, parse_verdict)
+                except ValueError:
+                    # No usable verdict even after re-asking: keep the current letter.
+                    count("writer.invalid_verdict")
+                    break
+                verdict = parse_verdict(summary)
+                stats.rounds += 1
+                stats.rating = verdict.rating
+                if options.stop_at and ratings.index(stats.rating) >= ratings.index(options.stop_at):
+                    break
+                prompt = Writer.refine(verdict, None if options.merged else evaluation, i)
+                if prompt is None or exhausted():
+                    break
+                letter = await call("writer", prompt)
+        stats.seconds = time.perf_counter() - start
+        if key:
+            cache.put(key, letter)
         return letter
 
     return workflow
 
 
-if __name__ == "__main__":
-    import sys
-    import asyncio
-    import argparse
+def add_refine_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("-n", "--rounds", help="最多修改轮数 (默认: 3)", type=int, default=3)
+    cliparser.add_argument("--merged_eval", help="评审直接输出结构化结论，省去单独的总结调用", action="store_true")
+    cliparser.add_argument("--stop_at", help="评级达到该等级时停止修改 (EXCELLENT, GOOD, FAIR, POOR)", type=str, choices=ratings)
+    cliparser.add_argument("--max_tokens", help="单篇文案的tokens预算", type=int)
+    cliparser.add_argument("--max_seconds", help="单篇文案的耗时预算，单位为秒", type=float)
+
+
+def refine_options(args: argparse.Namespace) -> RefineOptions:
+    return RefineOptions(merged=args.merged_eval, stop_at=args.stop_at, max_tokens=args.max_tokens, max_seconds=args.max_seconds)
 
-    cliparser = argparse.ArgumentParser(description="针对岗位撰写沟通文案。")
+
+description = "针对岗位撰写沟通文案。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
     cliparser.add_argument("--resume", help="简历文件路径 (目前只支持文本文件，推荐使用Markdown)", type=str, required=True)
     cliparser.add_argument("-O", "--output", help="输出文件路径 (默认: output.md)", type=str, default="output.md")
-    args, _ = cliparser.parse_known_args()
+    add_profile_args(cliparser)
+    add_refine_args(cliparser)
+    add_cache_args(cliparser)
+    add_ratelimit_args(cliparser)
+
+
+async def main(args: argparse.Namespace) -> None:
+    configure_limits(args)
+    with open(args.resume, "r") as f:
+        resume = f.read()
+    job_description = sys.stdin.read()
+    candidate = await describe_candidate(resume, args.full_resume, args.profiles)
+    workflow = spawn_workflow(candidate, job_description, open_cache(args), refine_options(args))
+    stats = LetterStats()
+    letter = await workflow(args.rounds, stats)
+    print(stats.report(), file=sys.stderr)
+    with open(args.output, "w") as f:
+        print(letter, file=f)
 
-    async def main() -> None:
-        with open(args.resume, "r") as f:
-            resume = f.read()
-        job_description = sys.stdin.read()
-        workflow = spawn_workflow(resume, job_description)
-        letter = await workflow(3)
-        with open(args.output, "w") as f:
-            print(letter, file=f)
 
-    asyncio.run(main())
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
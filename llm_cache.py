@@ -0,0 +1,84 @@
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+
+
+class LLMCache:
+    _conn: sqlite3.Connection
+    _ttl: float | None
+    _max_entries: int
+
+    def __init__(self, path: str = ".llm_cache.db", ttl: float | None = 7 * 86400, max_entries: int = 10000):
+        self._conn = sqlite3.connect(Path(path).resolve())
+        self._conn.executescript("""
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+""")
+        self._ttl = ttl
+        self._max_entries = max_entries
+
+    def __enter__(self) -> "LLMCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def key(*parts: object) -> str:
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        with self._conn:
+            if self._ttl is not None and now - row[1] > self._ttl:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self._conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self._max_entries,))
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+
+def add_cache_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--cache", help="模型结果缓存文件路径 (默认: .llm_cache.db)", type=str, default=".llm_cache.db")
+    cliparser.add_argument("--cache_ttl", help="缓存有效期，单位为小时 (默认: 168)", type=float, default=168)
+    cliparser.add_argument("--cache_size", help="缓存最大条目数 (默认: 10000)", type=int, default=10000)
+    cliparser.add_argument("--no_cache", help="不使用模型结果缓存", action="store_true")
+    cliparser.add_argument("--clear_cache", help="运行前清空模型结果缓存", action="store_true")
+
+
+def open_cache(args: argparse.Namespace) -> LLMCache | None:
+    if args.no_cache and not args.clear_cache:
+        return None
+    cache = LLMCache(args.cache, args.cache_ttl * 3600, args.cache_size)
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache.close()
+        return None
+    return cache
@@ -1,51 +1,237 @@
+import sys
 import json
 import asyncio
 import argparse
-from boss_zhipin import BossZhipin
-from job_eval import spawn_workflow
+from typing import TYPE_CHECKING
+from contextlib import nullcontext
+from job_store import JobStore
+from salary import add_salary_args, salary_floor
+from job_stream import JobStream
+from dedup import DedupIndex
+from job_eval import JobEvaluator, add_cascade_args, cascade_options
+from resume import add_profile_args, describe_candidate
+from llm_cache import add_cache_args, open_cache
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from rank import rank
+from tracing import traced, count
 
+if TYPE_CHECKING:
+    from boss_zhipin import Job
 
-if __name__ == "__main__":
-    cliparser = argparse.ArgumentParser(description="查询匹配的岗位。")
-    # cliparser.add_argument("--resume", help="简历文件路径 (目前只支持文本文件，推荐使用Markdown)", type=str, required=True)
-    cliparser.add_argument("-q", "--query", help="查询关键字", type=str, default="")
+
+async def favor(job: "Job") -> bool:
+    try:
+        await job.favor()
+        return True
+    except Exception as e:
+        # Callers store an accepted rating only after the click, so a later run evaluates and favors the job again.
+        print(f"{job.url}: 收藏失败，跳过: {e!r}", file=sys.stderr)
+        count("favor.failed")
+        return False
+
+
+def add_search_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("-j", "--concurrency", help="并发查询的标签页数量 (默认: 2)", type=int, default=2)
     cliparser.add_argument("--city", help="BOSS直聘城市代码 (默认: 100010000)", type=str, default="100010000")
     cliparser.add_argument("--salary", help="BOSS直聘薪资代码", type=str)
     cliparser.add_argument("-n", "--scroll_n", help="最大滚动次数 (默认: 8)", type=int, default=8)
     cliparser.add_argument("--filter_tags", help="需要过滤的岗位标签 (默认: 派遣,猎头)", type=str, default="派遣,猎头")
     cliparser.add_argument("--ratings", help="可接受的岗位评级 (默认: EXCELLENT,GOOD)", type=str, default="EXCELLENT,GOOD")
+    add_salary_args(cliparser)
     cliparser.add_argument("--blacklist", help="公司黑名单文件路径 (每行一个公司名称)", type=str)
-    cliparser.add_argument("-O", "--output", help="岗位列表JSON文件输出路径 (默认: favor_jobs.json)", type=str, default="favor_jobs.json")
-    args, _ = cliparser.parse_known_args()
+    cliparser.add_argument("--no_block", help="不拦截图片、字体等无关资源及统计脚本", action="store_true")
+    cliparser.add_argument("--no_capture", help="禁用接口数据截获，逐个点击岗位卡片读取详情", action="store_true")
+
+
+def check_search_args(cliparser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.cascade and args.batch_size > 1:
+        cliparser.error("--cascade 不能与 --batch_size 同时使用")
+    if not 0 < args.dedup_threshold <= 1:
+        cliparser.error("--dedup_threshold 取值范围为0~1")
+
+
+description = "查询匹配的岗位。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--resume", help="简历文件路径，指定后对岗位进行评判并收藏符合评级的岗位 (目前只支持文本文件，推荐使用Markdown)", type=str)
+    cliparser.add_argument("-q", "--query", help="查询关键字", type=str, default="")
+    cliparser.add_argument("--queries", help="批量查询关键字 (逗号分隔)", type=str)
+    cliparser.add_argument("--spec", help="批量查询配置JSON文件路径 (对象数组，字段: query, city, salary, scroll_n)", type=str)
+    add_search_args(cliparser)
+    cliparser.add_argument("--db", help="岗位数据库文件路径，启用后跳过已抓取且未变化的岗位", type=str)
+    cliparser.add_argument("--known_run", help="连续遇到多少个已知岗位时停止滚动 (默认: 10，0表示不提前停止)", type=int, default=10)
+    cliparser.add_argument("--dedup", help="检测近似重复的岗位，重复岗位沿用首个岗位的评判结果 (需要指定--db)", action="store_true")
+    cliparser.add_argument("--dedup_threshold", help="判定为重复岗位的岗位描述相似度下限 (MinHash估算的Jaccard相似度，0~1，默认: 0.8)", type=float, default=0.8)
+    cliparser.add_argument("--route_stats", help="运行结束时输出网络请求统计", action="store_true")
+    cliparser.add_argument("-w", "--workers", help="并发评判岗位的数量 (默认: 4)", type=int, default=4)
+    cliparser.add_argument("--queue_size", help="等待评判的岗位队列长度上限 (默认: 16)", type=int, default=16)
+    cliparser.add_argument("--top_k", help="每个查询仅评判本地预排序得分最高的前K个岗位 (与简历没有共同词语的岗位不评判)", type=int)
+    cliparser.add_argument("--min_score", help="仅评判本地预排序得分不低于本次查询最高得分该比例的岗位 (0~1，为相对得分，最高分岗位总会入选)", type=float)
+    cliparser.add_argument("--batch_size", help="单次请求最多评判的岗位数量，大于1时启用批量评判 (默认: 1)", type=int, default=1)
+    cliparser.add_argument("--context_tokens", help="批量评判时模型的上下文长度上限 (默认: 根据模型自动获取)", type=int)
+    add_profile_args(cliparser)
+    add_cascade_args(cliparser)
+    add_cache_args(cliparser)
+    add_ratelimit_args(cliparser)
+    cliparser.add_argument("--trace", help="将各阶段耗时及tokens用量写入JSONL文件，并在结束时输出汇总", type=str)
+    cliparser.add_argument("-O", "--output", help="岗位列表输出路径，.jsonl文件逐条写入并可从检查点恢复，.json文件在结束时一次写入 (默认: favor_jobs.jsonl)", type=str, default="favor_jobs.jsonl")
+    cliparser.add_argument("--restart", help="忽略上次中断留下的检查点，重新开始查询", action="store_true")
+
 
-    async def main() -> None:
-        filter_tags = set(t.strip() for t in args.filter_tags.split(","))
-        ratings = set(r.strip() for r in args.ratings.split(","))
-        # with open(args.resume, "r") as f:
-        #     resume = f.read()
-        if args.blacklist:
-            with open(args.blacklist, "r") as f:
-                blacklist = set(company.strip() for company in f.readlines())
-        else:
-            blacklist = None
-        favor_jobs = []
-        zhipin = BossZhipin()
-        async for job in zhipin.query_jobs(
-            query = args.query,
-            city = args.city,
-            salary = args.salary,
-            scroll_n = args.scroll_n,
-            filter_tags = filter_tags,
-            blacklist = blacklist
-        ):
-            # workflow = spawn_workflow()
-            # result = json.loads(await workflow(resume, job.description()))
-            # if result["rating"] in ratings:
-            #     await job.favor()
-            #     favor_jobs.append(job.model_dump())
-            favor_jobs.append(job.model_dump())
-        if len(favor_jobs) > 0:
-            with open(args.output, "w", encoding='utf-8') as f:
-                json.dump(favor_jobs, f, ensure_ascii=False, indent=4)
-
-    asyncio.run(main())
+def check_args(cliparser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    check_search_args(cliparser, args)
+    if args.dedup and not args.db:
+        cliparser.error("--dedup 需要同时指定 --db")
+
+
+async def main(args: argparse.Namespace) -> None:
+    from boss_zhipin import BossZhipin, Job
+    configure_limits(args)
+    filter_tags = set(t.strip() for t in args.filter_tags.split(","))
+    ratings = set(r.strip() for r in args.ratings.split(","))
+    if args.resume:
+        with open(args.resume, "r") as f:
+            resume = f.read()
+        candidate = await describe_candidate(resume, args.full_resume, args.profiles)
+    if args.blacklist:
+        with open(args.blacklist, "r") as f:
+            blacklist = set(company.strip() for company in f.readlines())
+    else:
+        blacklist = None
+    searches = []
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            searches.extend(json.load(f))
+    if args.queries:
+        searches.extend(dict(query=q.strip()) for q in args.queries.split(",") if q.strip())
+    if args.query or not searches:
+        searches.append(dict(query=args.query))
+    prerank = args.top_k is not None or args.min_score is not None
+    queue = asyncio.Queue(maxsize=args.queue_size)
+    inflight = {}
+
+    async def enqueue(job: Job, pending: list[asyncio.Future]) -> None:
+        done = asyncio.get_running_loop().create_future()
+        inflight[job.url] = done
+        await queue.put((job, done))
+        pending.append(done)
+
+    def rated(url: str) -> bool:
+        canonical = store.get(url)
+        return canonical is not None and canonical.rating is not None
+
+    async def inherit(job: Job) -> None:
+        if job.cluster in inflight:
+            await inflight[job.cluster]
+        canonical = store.get(job.cluster)
+        if canonical and canonical.rating:
+            if canonical.rating in ratings:
+                if not await favor(job):
+                    return
+                output.write(job.model_dump())
+            store.set_evaluation(job.url, canonical.rating, canonical.evaluation)
+            count("dedup.inherited")
+        output.mark(job.url)
+
+    async def search(zhipin: BossZhipin, spec: dict) -> None:
+        pending = []
+        candidates = []
+        async with zhipin.page() as page:
+            async for job in zhipin.query_jobs(
+                query = spec["query"],
+                city = spec.get("city", args.city),
+                salary = spec.get("salary", args.salary),
+                scroll_n = spec.get("scroll_n", args.scroll_n),
+                filter_tags = filter_tags,
+                blacklist = blacklist,
+                capture = not args.no_capture,
+                store = store,
+                known_run = args.known_run,
+                require_rating = evaluator is not None,
+                salary_floor = salary_floor(args),
+                seen = output.processed,
+                page = page
+            ):
+                # Concurrent searches can list the same job; it is evaluated and favored once.
+                if job.url in inflight or job.url in output.processed:
+                    continue
+                if dedup:
+                    info = job.model_dump()
+                    job.cluster = dedup.cluster(job.url, info["company"], info["desc"])
+                if not evaluator:
+                    output.write(job.model_dump())
+                    output.mark(job.url)
+                elif dedup and job.cluster != job.url and (job.cluster in inflight or rated(job.cluster)):
+                    inflight[job.url] = asyncio.ensure_future(inherit(job))
+                    pending.append(inflight[job.url])
+                elif prerank:
+                    candidates.append(job)
+                else:
+                    await enqueue(job, pending)
+            if candidates:
+                for i, _ in rank(resume, [job.description() for job in candidates], args.top_k, args.min_score):
+                    if candidates[i].url not in inflight:
+                        await enqueue(candidates[i], pending)
+            # Accepted jobs are favored on this page, so keep it until they are evaluated.
+            await asyncio.gather(*pending)
+
+    async def produce(zhipin: BossZhipin) -> None:
+        await asyncio.gather(*(search(zhipin, spec) for spec in searches))
+        for _ in range(args.workers if evaluator else 0):
+            await queue.put(None)
+
+    async def evaluate() -> None:
+        stop = False
+        while not stop and (item := await queue.get()) is not None:
+            items = [item]
+            while len(items) < args.batch_size and not queue.empty():
+                if (item := queue.get_nowait()) is None:
+                    stop = True
+                    break
+                items.append(item)
+            try:
+                try:
+                    if args.batch_size > 1:
+                        results = await evaluator.evaluate_batch(candidate, [job.description() for job, _ in items], args.batch_size)
+                    else:
+                        results = [await evaluator.evaluate(candidate, job.description()) for job, _ in items]
+                except Exception as e:
+                    # Left unmarked, so a resumed run evaluates these jobs again.
+                    print(f"评判失败，跳过{len(items)}个岗位: {e!r}", file=sys.stderr)
+                    count("eval.failed", len(items))
+                    continue
+                for (job, _), result in zip(items, results):
+                    if result is None:
+                        continue
+                    rating = json.loads(result)["rating"]
+                    if rating in ratings:
+                        if not await favor(job):
+                            continue
+                        output.write(job.model_dump())
+                    if store:
+                        store.set_evaluation(job.url, rating)
+                    output.mark(job.url)
+            finally:
+                for _, done in items:
+                    done.set_result(None)
+
+    with traced(args.trace), JobStore(args.db) if args.db else nullcontext() as store, open_cache(args) or nullcontext() as cache, JobStream(args.output, args.restart) as output, DedupIndex(args.db, args.dedup_threshold) if args.dedup else nullcontext() as dedup:
+        async with BossZhipin(max_pages=args.concurrency, block=not args.no_block, stats=args.route_stats) as zhipin, JobEvaluator(cache, args.context_tokens, cascade_options(args)) if args.resume else nullcontext() as evaluator:
+            await asyncio.gather(produce(zhipin), *(evaluate() for _ in range(args.workers if evaluator else 0)))
+            if evaluator and args.batch_size > 1:
+                print(evaluator.stats.report(), file=sys.stderr)
+            if evaluator and args.cascade:
+                print(evaluator.cascade_stats.report(), file=sys.stderr)
+            if limiter.troubled():
+                print(limiter.report(), file=sys.stderr)
+            if args.route_stats:
+                print(zhipin.route_stats.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    check_args(cliparser, args)
+    asyncio.run(main(args))
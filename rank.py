@@ -0,0 +1,62 @@
+import re
+import math
+from collections import Counter
+
+
+token_pattern = re.compile(r"[a-z0-9][a-z0-9+#.]*|[一-鿿]+")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for m in token_pattern.finditer(text.lower()):
+        word = m.group()
+        if word[0] < "一":
+            tokens.append(word.rstrip("."))
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25:
+    _postings: dict[str, list[tuple[int, int]]]
+    _norms: list[float]
+    _idf: dict[str, float]
+
+    def __init__(self, docs: list[str], k1: float = 1.5, b: float = 0.75):
+        self._k1 = k1
+        self._postings = {}
+        lengths = []
+        for i, doc in enumerate(docs):
+            tf = Counter(tokenize(doc))
+            lengths.append(sum(tf.values()))
+            for term, n in tf.items():
+                self._postings.setdefault(term, []).append((i, n))
+        avgdl = sum(lengths) / len(lengths) if lengths else 0
+        self._norms = [k1 * (1 - b + b * n / avgdl) if avgdl else k1 for n in lengths]
+        self._idf = {
+            term: math.log(1 + (len(docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def scores(self, query: str) -> list[float]:
+        scores = [0.0] * len(self._norms)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            idf = self._idf[term]
+            for i, tf in postings:
+                scores[i] += idf * tf * (self._k1 + 1) / (tf + self._norms[i])
+        return scores
+
+
+def rank(query: str, docs: list[str], top_k: int | None = None, min_score: float | None = None) -> list[tuple[int, float]]:
+    scores = BM25(docs).scores(query)
+    top = max(scores, default=0.0)
+    # Scores are relative to the best document, so min_score always keeps it; documents sharing no term are dropped outright.
+    ranked = sorted(((i, s / top) for i, s in enumerate(scores) if s > 0), key=lambda x: x[1], reverse=True)
+    if min_score is not None:
+        ranked = [(i, s) for i, s in ranked if s >= min_score]
+    return ranked[:top_k] if top_k is not None else ranked
@@ -0,0 +1,222 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable
+from pydantic import BaseModel
+from tracing import count
+
+
+transient_status = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+transient_errors = {"APIConnectionError", "APITimeoutError", "ServerError", "ServiceUnavailable", "RemoteProtocolError", "ReadTimeout", "ConnectError"}
+
+
+class Limits(BaseModel):
+    rpm: float | None = None
+    tpm: float | None = None
+    concurrency: int = 8
+    min_concurrency: int = 1
+    retries: int = 5
+    reasks: int = 1
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+
+class LimiterStats(BaseModel):
+    requests: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    reasks: int = 0
+    failures: int = 0
+    waited: float = 0.0
+
+    def report(self) -> str:
+        return f"请求 {self.requests}次, 重试 {self.retries}次 (限流 {self.rate_limited}次), 重新提问 {self.reasks}次, 失败 {self.failures}次, 排队 {self.waited:.1f}秒"
+
+
+def status_code(e: BaseException) -> int | None:
+    code = getattr(e, "status_code", None) or getattr(e, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(e: BaseException) -> bool:
+    return status_code(e) == 429 or "RESOURCE_EXHAUSTED" in str(e) or "rate limit" in str(e).lower()
+
+
+def is_transient(e: BaseException) -> bool:
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError)) or is_rate_limited(e):
+        return True
+    return status_code(e) in transient_status or type(e).__name__ in transient_errors
+
+
+def retry_after(e: BaseException) -> float | None:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    _rate: float
+    _capacity: float
+    _tokens: float
+    _updated: float
+
+    def __init__(self, per_minute: float):
+        self._rate = per_minute / 60
+        self._capacity = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, n: float = 1) -> float:
+        n = min(n, self._capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return waited
+                delay = (n - self._tokens) / self._rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class ModelLimiter:
+    limits: Limits
+    _limit: float
+    _active: int
+    _epoch: int
+    stats: LimiterStats
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self._requests = TokenBucket(limits.rpm) if limits.rpm else None
+        self._tokens = TokenBucket(limits.tpm) if limits.tpm else None
+        self._limit = float(limits.concurrency)
+        self._active = 0
+        self._epoch = 0
+        self._slots = asyncio.Condition()
+        self.stats = LimiterStats()
+
+    @property
+    def concurrency(self) -> int:
+        return max(self.limits.min_concurrency, int(self._limit))
+
+    async def _acquire(self, tokens: int) -> int:
+        start = time.monotonic()
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+            epoch = self._epoch
+        if self._requests:
+            await self._requests.acquire()
+        if self._tokens and tokens:
+            await self._tokens.acquire(tokens)
+        self.stats.waited += time.monotonic() - start
+        return epoch
+
+    async def _release(self, epoch: int, rate_limited: bool) -> None:
+        async with self._slots:
+            self._active -= 1
+            if rate_limited:
+                # Requests already in flight at the last decrease saw the old limit, so back off once per epoch.
+                if epoch == self._epoch:
+                    self._limit = max(self.limits.min_concurrency, self._limit / 2)
+                    self._epoch += 1
+            else:
+                self._limit = min(self.limits.concurrency, self._limit + 1 / max(self._limit, 1))
+            self._slots.notify_all()
+
+    async def call(self, send: Callable[[], Awaitable[str]], tokens: int = 0) -> str:
+        for attempt in range(self.limits.retries + 1):
+            epoch = await self._acquire(tokens)
+            self.stats.requests += 1
+            rate_limited = False
+            try:
+                return await send()
+            except Exception as e:
+                if not is_transient(e) or attempt == self.limits.retries:
+                    self.stats.failures += 1
+                    raise
+                rate_limited = is_rate_limited(e)
+                delay = min(self.limits.max_delay, self.limits.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+                delay = max(delay, retry_after(e) or 0)
+            finally:
+                await self._release(epoch, rate_limited)
+            self.stats.retries += 1
+            count("llm.retry")
+            if rate_limited:
+                self.stats.rate_limited += 1
+                count("llm.rate_limited")
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    _default: Limits
+    _overrides: dict[str, Limits]
+    _models: dict[str, ModelLimiter]
+
+    def __init__(self, default: Limits = Limits(), overrides: dict[str, Limits] | None = None):
+        self.configure(default, overrides)
+
+    def configure(self, default: Limits, overrides: dict[str, Limits] | None = None) -> None:
+        self._default = default
+        self._overrides = overrides or {}
+        self._models = {}
+
+    def model(self, name: str) -> ModelLimiter:
+        if name not in self._models:
+            self._models[name] = ModelLimiter(self._overrides.get(name, self._default))
+        return self._models[name]
+
+    async def ask(self, model: str, send: Callable[[str], Awaitable[str]], prompt: str, tokens: int = 0, parse: Callable[[str], Any] | None = None) -> str:
+        limiter = self.model(model)
+        message = prompt
+        for attempt in range(limiter.limits.reasks + 1):
+            raw = await limiter.call(lambda: send(message), tokens)
+            if parse is None:
+                return raw
+            try:
+                parse(raw)
+                return raw
+            except ValueError as e:
+                if attempt == limiter.limits.reasks:
+                    limiter.stats.failures += 1
+                    raise
+                error = str(e).splitlines()[0]
+            limiter.stats.reasks += 1
+            count("llm.reask")
+            message = f"{prompt}\n\n注意: 上一次的回复无法解析 ({error})，请严格按照要求的格式回复，不要添加任何其他内容。"
+
+    def report(self) -> str:
+        return "\n".join(f"{name}: {m.stats.report()}, 当前并发上限 {m.concurrency}" for name, m in self._models.items())
+
+    def troubled(self) -> bool:
+        return any(m.stats.retries or m.stats.reasks or m.stats.failures for m in self._models.values())
+
+
+limiter = RateLimiter()
+
+
+def add_ratelimit_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--rpm", help="每个模型每分钟最多请求次数 (默认不限)", type=float)
+    cliparser.add_argument("--tpm", help="每个模型每分钟最多输入tokens (估算值，默认不限)", type=float)
+    cliparser.add_argument("--llm_concurrency", help="每个模型的最大并发请求数，遇到限流时自动减半并逐步恢复 (默认: 8)", type=int, default=8)
+    cliparser.add_argument("--llm_retries", help="模型请求遇到限流或临时错误时的最大重试次数 (默认: 5)", type=int, default=5)
+    cliparser.add_argument("--rate_limits", help="按模型配置限流的JSON文件路径 (对象，键为模型名称，字段: rpm, tpm, concurrency, retries)", type=str)
+
+
+def configure_limits(args: argparse.Namespace) -> None:
+    default = Limits(rpm=args.rpm, tpm=args.tpm, concurrency=args.llm_concurrency, retries=args.llm_retries)
+    overrides = {}
+    if args.rate_limits:
+        with open(args.rate_limits, "r", encoding="utf-8") as f:
+            for model, limits in json.load(f).items():
+                overrides[model] = default.model_copy(update=limits)
+    limiter.configure(default, overrides)
@@ -0,0 +1,144 @@
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING
+from pydantic import BaseModel
+from job_store import content_hash
+from utils import remove_json_fences, model_name, estimate_tokens, request_params
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from tracing import llm
+
+if TYPE_CHECKING:
+    from mcp_agent.core.request_params import RequestParams
+
+
+class Profile(BaseModel):
+    skills: list[str] = []
+    years: float | None = None
+    target_roles: list[str] = []
+    salary_expectation: str | None = None
+    highlights: list[str] = []
+
+    def render(self) -> str:
+        years = f"{self.years:g}年" if self.years is not None else "未知"
+        highlights = "\n".join(f"- {h}" for h in self.highlights)
+        return f"""<candidate-profile>
+<skills>{", ".join(self.skills)}</skills>
+<years-of-experience>{years}</years-of-experience>
+<target-roles>{", ".join(self.target_roles)}</target-roles>
+<salary-expectation>{self.salary_expectation or "未说明"}</salary-expectation>
+<highlights>
+{highlights}
+</highlights>
+</candidate-profile>"""
+
+
+class Distiller(BaseModel):
+    name: str = "distill"
+    instruction: str = """你是一位专业的招聘顾问，请将求职者的简历提炼为简洁的结构化档案，供后续评判岗位及撰写沟通文案使用。
+
+注意事项:
+
+1. 仅提取简历中明确出现的信息，不要推测或编造；
+2. 经历要点需保留可用于求职沟通的具体项目、成果及数据，每条不超过60字，最多8条；
+3. 技能请使用简历中的原始名称，按熟练程度排序。
+
+Your response MUST be valid JSON matching this exact format (no other text, markdown, or explanation):
+
+{"skills":["SKILL"],"years":YEARS,"target_roles":["ROLE"],"salary_expectation":"SALARY","highlights":["HIGHLIGHT"]}
+
+Where:
+
+- SKILL: A skill or technology mentioned in the resume
+- YEARS: Total years of work experience as a number, or null if unknown
+- ROLE: A job title the candidate is targeting or qualified for
+- SALARY: The expected salary as written in the resume, or null if not mentioned
+- HIGHLIGHT: A key experience, project or achievement (in Chinese)
+
+IMPORTANT: Your response should be ONLY the JSON object without any code fences, explanations, or other text."""
+    use_history: bool = False
+
+    @staticmethod
+    def request_params() -> "RequestParams":
+        return request_params(
+            maxTokens = 2048,
+            temperature = 0.2,
+            use_history = False
+        )
+
+    @staticmethod
+    def prompt(resume: str) -> str:
+        return f"""<bio-resume>
+{resume}
+</bio-resume>
+
+请提炼以上简历。"""
+
+
+def parse_profile(raw: str) -> Profile:
+    return Profile.model_validate_json(remove_json_fences(raw))
+
+
+def profile_path(resume: str, directory: str = ".profiles") -> Path:
+    return Path(directory) / f"{content_hash(resume)}.json"
+
+
+async def distill(resume: str, directory: str = ".profiles", model: str | None = None) -> Profile:
+    path = profile_path(resume, directory)
+    if path.exists():
+        return Profile.model_validate_json(path.read_text(encoding="utf-8"))
+    from mcp_agent.core.fastagent import FastAgent
+    fast = FastAgent("resume-distill", parse_cli_args=False)
+
+    @fast.agent(**Distiller().model_dump(), model=model, request_params=Distiller.request_params())
+    async def agents() -> None:
+        pass
+
+    prompt = Distiller.prompt(resume)
+    async with fast.run() as agent:
+        with llm(agent.distill, "distill", model_name(model)):
+            raw = await limiter.ask(model_name(model), agent.distill, prompt, estimate_tokens(Distiller().instruction + prompt), parse_profile)
+    profile = parse_profile(raw)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(profile.model_dump_json(indent=2), encoding="utf-8")
+    return profile
+
+
+async def describe_candidate(resume: str, full: bool = False, directory: str = ".profiles") -> str:
+    if full:
+        return f"<bio-resume>\n{resume}\n</bio-resume>"
+    return (await distill(resume, directory)).render()
+
+
+def add_profile_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--full_resume", help="在提示词中使用完整简历，而不是提炼后的求职者档案", action="store_true")
+    cliparser.add_argument("--profiles", help="求职者档案目录，按简历内容哈希保存，可手动修改 (默认: .profiles)", type=str, default=".profiles")
+
+
+description = "将简历提炼为结构化的求职者档案。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--resume", help="简历文件路径 (目前只支持文本文件，推荐使用Markdown)", type=str, required=True)
+    cliparser.add_argument("--profiles", help="求职者档案目录 (默认: .profiles)", type=str, default=".profiles")
+    cliparser.add_argument("--refresh", help="忽略已保存的档案，重新提炼", action="store_true")
+    add_ratelimit_args(cliparser)
+
+
+async def main(args: argparse.Namespace) -> None:
+    configure_limits(args)
+    with open(args.resume, "r") as f:
+        resume = f.read()
+    if args.refresh:
+        profile_path(resume, args.profiles).unlink(missing_ok=True)
+    profile = await distill(resume, args.profiles)
+    print(profile_path(resume, args.profiles), file=sys.stderr)
+    print(profile.render())
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
@@ -1,8 +1,8 @@
 <#
 .SYNOPSIS
-    Executes multiple job queries and saves results to timestamped JSON files.
+    Executes multiple job queries in one run and saves the merged results to a timestamped JSONL file.
 .DESCRIPTION
-    Runs the query.py script for each provided query, saving output to files named jobs_{query}_{timestamp}.json
+    Runs query.py once in batch mode for all provided queries, saving the deduplicated output to a file named jobs_{timestamp}.jsonl and indexing it into jobs.db for auto-zhipin search
 .PARAMETER Queries
     Array of job query strings to search for
 .PARAMETER City
@@ -11,6 +11,8 @@
     BOSS salary code (default: 406)
 .PARAMETER ScrollN
     Number of scrolls (default: 8)
+.PARAMETER Concurrency
+    Number of browser tabs querying concurrently (default: 2)
 .EXAMPLE
     .\run_queries.ps1 -Queries ".net","java","python"
 #>
@@ -21,21 +23,21 @@ param(
     
     [string]$City = "101020100",
     [string]$Salary = "406",
-    [int]$ScrollN = 8
+    [int]$ScrollN = 8,
+    [int]$Concurrency = 2
 )
 
-foreach ($query in $Queries) {
-    $timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
-    $outputFile = "jobs_$($query)_$($timestamp).json"
-    
-    Write-Host "Running query for: $query"
-    uv run query.py -q $query --city $City -n $ScrollN --salary $Salary --output $outputFile
-    
-    if (Test-Path $outputFile) {
-        Write-Host "Results saved to: $outputFile"
-    } else {
-        Write-Warning "No results found for query: $query"
-    }
+$timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
+$outputFile = "jobs_$($timestamp).jsonl"
+
+Write-Host "Running queries for: $($Queries -join ', ')"
+uv run query.py --queries ($Queries -join ",") --city $City -n $ScrollN --salary $Salary -j $Concurrency --output $outputFile
+
+if ((Test-Path $outputFile) -and (Get-Item $outputFile).Length -gt 0) {
+    Write-Host "Results saved to: $outputFile"
+    uv run auto-zhipin ingest $outputFile
+} else {
+    Write-Warning "No results found for queries: $($Queries -join ', ')"
 }
 
 Write-Host "All queries completed"
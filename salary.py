@@ -0,0 +1,95 @@
+import re
+import argparse
+from functools import lru_cache
+from typing import Literal
+from pydantic import BaseModel
+
+
+Period = Literal["month", "day", "hour", "week"]
+units: dict[str, tuple[float, Period]] = {
+    "K": (1000, "month"),
+    "k": (1000, "month"),
+    "千": (1000, "month"),
+    "万": (10000, "month"),
+    "元/月": (1, "month"),
+    "元/周": (1, "week"),
+    "元/天": (1, "day"),
+    "元/日": (1, "day"),
+    "元/时": (1, "hour"),
+    "元/小时": (1, "hour"),
+}
+monthly_factor: dict[Period, float] = {
+    "month": 1,
+    "week": 52 / 12,
+    "day": 21.75,
+    "hour": 21.75 * 8,
+}
+_unit = "|".join(re.escape(u) for u in sorted(units, key=len, reverse=True))
+salary_pattern = re.compile(
+    rf"(?P<low>\d+(?:\.\d+)?)\s*(?P<low_unit>{_unit})?"
+    rf"(?:\s*[-~～至]\s*(?P<high>\d+(?:\.\d+)?))?\s*(?P<unit>{_unit})"
+    r"(?:\s*[·•]?\s*(?P<months>\d+)\s*薪)?"
+)
+
+
+class Salary(BaseModel):
+    low: float | None = None
+    high: float | None = None
+    period: Period = "month"
+    months: int = 12
+    negotiable: bool = False
+
+    @property
+    def monthly_low(self) -> float | None:
+        return self.low * monthly_factor[self.period] if self.low is not None else None
+
+    @property
+    def monthly_high(self) -> float | None:
+        return self.high * monthly_factor[self.period] if self.high is not None else None
+
+    @property
+    def annual_high(self) -> float | None:
+        monthly = self.monthly_high
+        return monthly * self.months if monthly is not None else None
+
+
+class SalaryFloor(BaseModel):
+    monthly: float | None = None
+    annual: float | None = None
+
+    def accepts(self, salary: Salary | None) -> bool:
+        # Negotiable or unrecognised salaries are kept for the model to judge.
+        if salary is None or salary.high is None:
+            return True
+        if self.monthly is not None and salary.monthly_high < self.monthly:
+            return False
+        return self.annual is None or salary.annual_high >= self.annual
+
+
+def add_salary_args(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--min_salary", help="最低月薪，单位为K，按月薪上限判断 (日薪、时薪按月折算，面议岗位保留)", type=float)
+    cliparser.add_argument("--min_annual", help="最低年薪，单位为万，按月薪上限及薪资月数计算", type=float)
+
+
+def salary_floor(args: argparse.Namespace) -> SalaryFloor | None:
+    if args.min_salary is None and args.min_annual is None:
+        return None
+    return SalaryFloor(
+        monthly = args.min_salary * 1000 if args.min_salary is not None else None,
+        annual = args.min_annual * 10000 if args.min_annual is not None else None,
+    )
+
+
+@lru_cache(maxsize=4096)
+def parse_salary(salary: str) -> Salary | None:
+    m = salary_pattern.search(salary)
+    if m is None:
+        return Salary(negotiable=True) if "面议" in salary else None
+    scale, period = units[m.group("unit")]
+    low_scale = units[m.group("low_unit")][0] if m.group("low_unit") else scale
+    low = float(m.group("low")) * low_scale
+    high = float(m.group("high")) * scale if m.group("high") else low
+    months = int(m.group("months")) if m.group("months") else 12
+    if high < low:
+        low, high = high, low
+    return Salary(low=low, high=high, period=period, months=months if 12 <= months <= 24 else 12, negotiable="面议" in salary)
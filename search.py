@@ -0,0 +1,50 @@
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from job_store import JobStore
+from job_stream import JobStream
+from salary import add_salary_args, salary_floor
+
+
+description = "在岗位数据库中全文检索岗位，并可导出为apply读取的岗位列表。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("text", help="检索关键字，多个关键字需同时匹配标题、公司或岗位描述", type=str, nargs="*")
+    cliparser.add_argument("--db", help="岗位数据库文件路径 (默认: jobs.db)", type=str, default="jobs.db")
+    cliparser.add_argument("--company", help="公司名称 (部分匹配)", type=str)
+    cliparser.add_argument("--since", help="仅检索该日期后出现过的岗位 (例如: 2025-01-01)", type=str)
+    cliparser.add_argument("--days", help="仅检索最近N天内出现过的岗位", type=float)
+    cliparser.add_argument("--ratings", help="岗位评级 (逗号分隔，例如: EXCELLENT,GOOD)", type=str)
+    add_salary_args(cliparser)
+    cliparser.add_argument("--limit", help="最多返回的岗位数量，0表示不限 (默认: 50)", type=int, default=50)
+    cliparser.add_argument("-O", "--output", help="将匹配的岗位导出为apply --jobs可读取的文件 (.json或.jsonl)", type=str)
+
+
+async def main(args: argparse.Namespace) -> None:
+    since = args.since
+    if args.days is not None:
+        since = max(since or "", (datetime.now() - timedelta(days=args.days)).isoformat(timespec="seconds"))
+    ratings = set(r.strip() for r in args.ratings.split(",") if r.strip()) if args.ratings else None
+    with JobStore(args.db) as store:
+        start = time.perf_counter()
+        jobs = store.search(" ".join(args.text), args.company, since, ratings, salary_floor(args), args.limit)
+        elapsed = time.perf_counter() - start
+    if args.output:
+        with JobStream(args.output, restart=True) as output:
+            for job in jobs:
+                output.write(dict(company=job.company, title=job.title, salary=job.salary, desc=job.desc, url=job.url))
+                output.mark(job.url)
+    else:
+        for job in jobs:
+            print(f"{job.last_seen[:10]}  {job.rating or '-':9}  {job.company}  {job.title}  {job.salary}  {job.url}")
+    print(f"匹配 {len(jobs)}个岗位, 耗时 {elapsed * 1000:.1f}毫秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    asyncio.run(main(args))
@@ -0,0 +1,121 @@
+import sys
+import json
+import time
+from typing import Any, Iterator, TextIO
+from contextlib import contextmanager, nullcontext
+
+
+class Tracer:
+    _file: TextIO | None
+    _spans: dict[str, list[float]]
+    _counters: dict[str, int]
+    _tokens: dict[str, list[int]]
+    _seen: dict[int, tuple[int, int]]
+
+    def __init__(self):
+        self._file = None
+        self._spans = {}
+        self._counters = {}
+        self._tokens = {}
+        self._seen = {}
+        self._start = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def open(self, path: str) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+        self._start = time.perf_counter()
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            elapsed = time.perf_counter() - start
+            self._spans.setdefault(name, []).append(elapsed)
+            self._write(dict(type="span", name=name, start=start - self._start, seconds=elapsed, **attrs))
+
+    def count(self, name: str, n: int = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + n
+        self._write(dict(type="count", name=name, n=n, at=time.perf_counter() - self._start))
+
+    def tokens(self, model: str, prompt: int, completion: int) -> None:
+        usage = self._tokens.setdefault(model, [0, 0])
+        usage[0] += prompt
+        usage[1] += completion
+        self._write(dict(type="tokens", model=model, prompt=prompt, completion=completion))
+
+    def usage(self, acc: Any) -> tuple[int, int]:
+        # Deltas are taken against the last reading of this accumulator, so totals stay exact even
+        # when calls on one agent overlap; only the split between overlapping calls is approximate.
+        prompt, completion = self._seen.get(id(acc), (0, 0))
+        self._seen[id(acc)] = (acc.cumulative_input_tokens, acc.cumulative_output_tokens)
+        return acc.cumulative_input_tokens - prompt, acc.cumulative_output_tokens - completion
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self._start
+        lines = [f"{'阶段':<24}{'次数':>8}{'p50(s)':>10}{'p95(s)':>10}{'合计(s)':>10}"]
+        for name, samples in sorted(self._spans.items(), key=lambda x: -sum(x[1])):
+            samples = sorted(samples)
+            p50 = samples[len(samples) // 2]
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            lines.append(f"{name:<24}{len(samples):>8}{p50:>10.3f}{p95:>10.3f}{sum(samples):>10.1f}")
+        for name, n in self._counters.items():
+            lines.append(f"{name}: {n} ({n * 60 / elapsed:.1f}/min)")
+        jobs = self._counters.get("jobs") or self._counters.get("applied") or 0
+        for model, (prompt, completion) in self._tokens.items():
+            per_job = f", 每个岗位 {(prompt + completion) / jobs:.0f} tokens" if jobs else ""
+            lines.append(f"{model}: prompt {prompt} tokens, completion {completion} tokens{per_job}")
+        return "\n".join(lines)
+
+
+tracer = Tracer()
+_null = nullcontext({})
+
+
+def span(name: str, **attrs: Any):
+    return tracer.span(name, **attrs) if tracer.enabled else _null
+
+
+def count(name: str, n: int = 1) -> None:
+    if tracer.enabled:
+        tracer.count(name, n)
+
+
+@contextmanager
+def llm(agent: Any, name: str, model: str) -> Iterator[None]:
+    if not tracer.enabled:
+        yield
+        return
+    with tracer.span(f"llm.{name}", model=model) as attrs:
+        yield
+        acc = getattr(agent, "usage_accumulator", None)
+        if acc is None:
+            return
+        prompt, completion = tracer.usage(acc)
+        attrs.update(prompt_tokens=prompt, completion_tokens=completion)
+    tracer.tokens(model, prompt, completion)
+
+
+@contextmanager
+def traced(path: str | None) -> Iterator[None]:
+    if not path:
+        yield
+        return
+    tracer.open(path)
+    try:
+        yield
+    finally:
+        print(tracer.summary(), file=sys.stderr)
+        tracer.close()
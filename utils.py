@@ -1,5 +1,38 @@
 import re
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterable, Iterable, TypeVar
+
+if TYPE_CHECKING:
+    from mcp_agent.core.request_params import RequestParams
+
+
+T = TypeVar("T")
 
 
 def remove_json_fences(raw: str):
     return re.sub(r"`{3}(json)?\n?", "", raw)
+
+
+def estimate_tokens(text: str) -> int:
+    narrow = sum(1 for c in text if c.isascii())
+    return narrow // 4 + len(text) - narrow
+
+
+def model_name(model: str | None = None) -> str:
+    if model:
+        return model
+    from mcp_agent.config import get_settings
+    return get_settings().default_model
+
+
+def request_params(**kwargs: Any) -> "RequestParams":
+    from mcp_agent.core.request_params import RequestParams
+    return RequestParams(**kwargs)
+
+
+async def as_async(items: Iterable[T] | AsyncIterable[T]) -> AsyncGenerator[T, None]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,184 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import traceback
+from datetime import datetime
+from contextlib import nullcontext
+from job_store import JobStore
+from salary import salary_floor
+from job_stream import JobStream
+from dedup import DedupIndex
+from job_eval import JobEvaluator, add_cascade_args, cascade_options
+from resume import add_profile_args, describe_candidate
+from llm_cache import add_cache_args, open_cache
+from ratelimit import limiter, add_ratelimit_args, configure_limits
+from tracing import traced, count
+from query import add_search_args, check_search_args, favor
+
+
+description = "常驻运行，定时执行保存的查询并仅处理新发布的岗位。"
+
+
+def add_arguments(cliparser: argparse.ArgumentParser) -> None:
+    cliparser.add_argument("--spec", help="保存的查询配置JSON文件路径 (对象数组，字段: query, city, salary, scroll_n, interval, jitter)", type=str, required=True)
+    cliparser.add_argument("--resume", help="简历文件路径，指定后对新岗位进行评判并收藏符合评级的岗位 (目前只支持文本文件，推荐使用Markdown)", type=str)
+    cliparser.add_argument("--interval", help="每个查询的执行间隔，单位为分钟 (默认: 30)", type=float, default=30)
+    cliparser.add_argument("--jitter", help="执行间隔的随机浮动比例 (默认: 0.2)", type=float, default=0.2)
+    cliparser.add_argument("--cycles", help="每个查询执行的轮数，0表示持续运行 (默认: 0)", type=int, default=0)
+    add_search_args(cliparser)
+    cliparser.add_argument("--db", help="岗位数据库文件路径 (默认: jobs.db)", type=str, default="jobs.db")
+    cliparser.add_argument("--known_run", help="连续遇到多少个已知岗位时停止滚动 (默认: 5)", type=int, default=5)
+    cliparser.add_argument("--dedup", help="检测近似重复的岗位，重复岗位沿用首个岗位的评判结果", action="store_true")
+    cliparser.add_argument("--dedup_threshold", help="判定为重复岗位的岗位描述相似度下限 (MinHash估算的Jaccard相似度，0~1，默认: 0.8)", type=float, default=0.8)
+    cliparser.add_argument("--login_ttl", help="重新检查登录状态的间隔，单位为分钟 (默认: 10)", type=float, default=10)
+    cliparser.add_argument("-w", "--workers", help="每个查询并发评判岗位的数量 (默认: 4)", type=int, default=4)
+    cliparser.add_argument("--batch_size", help="单次请求最多评判的岗位数量，大于1时启用批量评判 (默认: 1)", type=int, default=1)
+    add_profile_args(cliparser)
+    add_cascade_args(cliparser)
+    add_cache_args(cliparser)
+    add_ratelimit_args(cliparser)
+    cliparser.add_argument("--trace", help="将各阶段耗时及tokens用量写入JSONL文件，并在结束时输出汇总", type=str)
+    cliparser.add_argument("-O", "--output", help="收藏岗位JSONL文件输出路径 (默认: watch_jobs.jsonl)", type=str, default="watch_jobs.jsonl")
+
+
+def check_args(cliparser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    check_search_args(cliparser, args)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from boss_zhipin import BossZhipin, Job
+    configure_limits(args)
+    filter_tags = set(t.strip() for t in args.filter_tags.split(","))
+    ratings = set(r.strip() for r in args.ratings.split(","))
+    if args.resume:
+        with open(args.resume, "r") as f:
+            resume = f.read()
+        candidate = await describe_candidate(resume, args.full_resume, args.profiles)
+    if args.blacklist:
+        with open(args.blacklist, "r") as f:
+            blacklist = set(company.strip() for company in f.readlines())
+    else:
+        blacklist = None
+    with open(args.spec, "r", encoding="utf-8") as f:
+        searches = json.load(f)
+
+    async def evaluate(jobs: list[Job]) -> int:
+        urls = set(job.url for job in jobs)
+
+        def inherits(job: Job) -> bool:
+            if job.cluster in (None, job.url):
+                return False
+            canonical = store.get(job.cluster)
+            return job.cluster in urls or (canonical is not None and canonical.rating is not None)
+
+        fresh = [job for job in jobs if not inherits(job)]
+        if args.batch_size > 1:
+            try:
+                results = await evaluator.evaluate_batch(candidate, [job.description() for job in fresh], args.batch_size)
+            except Exception as e:
+                print(f"评判失败，跳过{len(fresh)}个岗位: {e!r}", file=sys.stderr)
+                count("eval.failed", len(fresh))
+                results = [None] * len(fresh)
+        else:
+            workers = asyncio.Semaphore(args.workers)
+
+            async def one(job: Job) -> str | None:
+                async with workers:
+                    try:
+                        return await evaluator.evaluate(candidate, job.description())
+                    except Exception as e:
+                        print(f"{job.url}: 评判失败，跳过: {e!r}", file=sys.stderr)
+                        count("eval.failed")
+                        return None
+
+            results = await asyncio.gather(*(one(job) for job in fresh))
+        verdicts = {}
+        for job, result in zip(fresh, results):
+            if result is not None:
+                verdicts[job.url] = (json.loads(result)["rating"], None)
+        favored = 0
+        for job in jobs:
+            if job in fresh:
+                if job.url not in verdicts:
+                    continue
+                rating, evaluation = verdicts[job.url]
+            else:
+                canonical = store.get(job.cluster)
+                rating, evaluation = verdicts.get(job.cluster) or (canonical.rating, canonical.evaluation)
+                if rating is None:
+                    output.mark(job.url)
+                    continue
+                count("dedup.inherited")
+            if rating in ratings:
+                if not await favor(job):
+                    continue
+                output.write(job.model_dump())
+                favored += 1
+            store.set_evaluation(job.url, rating, evaluation)
+            output.mark(job.url)
+        return favored
+
+    async def cycle(zhipin: BossZhipin, spec: dict) -> None:
+        start = time.perf_counter()
+        async with zhipin.page() as page:
+            jobs = [job async for job in zhipin.query_jobs(
+                query = spec["query"],
+                city = spec.get("city", args.city),
+                salary = spec.get("salary", args.salary),
+                scroll_n = spec.get("scroll_n", args.scroll_n),
+                filter_tags = filter_tags,
+                blacklist = blacklist,
+                capture = not args.no_capture,
+                store = store,
+                known_run = args.known_run,
+                require_rating = evaluator is not None,
+                salary_floor = salary_floor(args),
+                page = page
+            )]
+            if dedup:
+                for job in jobs:
+                    info = job.model_dump()
+                    job.cluster = dedup.cluster(job.url, info["company"], info["desc"])
+            if evaluator and jobs:
+                favored = await evaluate(jobs)
+            else:
+                favored = 0
+                for job in jobs:
+                    output.write(job.model_dump())
+                    output.mark(job.url)
+        now = datetime.now().isoformat(sep=" ", timespec="seconds")
+        print(f"{now} {spec['query']}: 新岗位 {len(jobs)}个, 收藏 {favored}个, 耗时 {time.perf_counter() - start:.1f}秒", file=sys.stderr)
+        if evaluator and args.cascade:
+            print(evaluator.cascade_stats.report(), file=sys.stderr)
+        if limiter.troubled():
+            print(limiter.report(), file=sys.stderr)
+
+    async def watch(zhipin: BossZhipin, spec: dict) -> None:
+        interval = spec.get("interval", args.interval) * 60
+        jitter = spec.get("jitter", args.jitter)
+        await asyncio.sleep(random.uniform(0, interval * jitter))
+        n = 0
+        while args.cycles <= 0 or n < args.cycles:
+            try:
+                await cycle(zhipin, spec)
+            except Exception:
+                # A failed cycle (captcha, timeout, model error) must not stop the other searches.
+                traceback.print_exc()
+            n += 1
+            if args.cycles <= 0 or n < args.cycles:
+                await asyncio.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+
+    with traced(args.trace), JobStore(args.db) as store, open_cache(args) or nullcontext() as cache, JobStream(args.output) as output, DedupIndex(args.db, args.dedup_threshold) if args.dedup else nullcontext() as dedup:
+        async with BossZhipin(max_pages=args.concurrency, block=not args.no_block, login_ttl=args.login_ttl * 60) as zhipin, JobEvaluator(cache, cascade=cascade_options(args)) if args.resume else nullcontext() as evaluator:
+            await asyncio.gather(*(watch(zhipin, spec) for spec in searches))
+
+
+if __name__ == "__main__":
+    cliparser = argparse.ArgumentParser(description=description)
+    add_arguments(cliparser)
+    args, _ = cliparser.parse_known_args()
+    check_args(cliparser, args)
+    asyncio.run(main(args))